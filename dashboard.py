@@ -3,11 +3,11 @@ Dashboard pro MeteoPanda
 """
 import streamlit as st
 import pandas as pd
-import yaml
-from typing import Dict, Optional
+from typing import Dict, Optional, TYPE_CHECKING
 import sys
 import os
-from streamlit_option_menu import option_menu
+import mmap
+import threading
 
 # Añadir el directorio src al path para importar módulos
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
@@ -21,19 +21,13 @@ logger = get_logger("dashboard")
 
 # Importar componentes del dashboard
 from src.dashboard.data_manager import DataManager
-from src.dashboard.filter_manager import FilterManager
+from src.dashboard.filter_manager import FilterManager, filter_dataframe_cached
 from src.dashboard.table_component import AdvancedTableComponent
-from src.dashboard.map_component import AdvancedMapComponent
 from src.dashboard.chart_component import AdvancedChartComponent
-from src.dashboard.analysis_strategies import (
-    AnalysisContext,
-    TrendAnalysisStrategy,
-    TemperatureAnalysisStrategy,
-    PrecipitationAnalysisStrategy,
-    SeasonalAnalysisStrategy,
-    AlertAnalysisStrategy,
-    ClimateComparisonStrategy
-)
+from src.dashboard.analysis_strategies import AnalysisContext
+
+if TYPE_CHECKING:
+    from src.dashboard.map_component import AdvancedMapComponent
 
 # Configuración de la página
 st.set_page_config(
@@ -43,34 +37,179 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Configuración de caché para configuración
-@st.cache_data
-def load_config():
+# Loader YAML compartido: parser C de libyaml si está disponible
+try:
+    from yaml import CSafeLoader as _YAML_LOADER
+except ImportError:
+    from yaml import SafeLoader as _YAML_LOADER
+
+CONFIG_PATH = 'config/config.yaml'
+
+def _read_config_file(path: str) -> Dict:
+    """Leer y parsear el YAML de configuración"""
+    # libyaml consume los bytes del mmap directamente, sin decodificar a un str intermedio
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        loader = _YAML_LOADER(mm)
+        try:
+            return loader.get_single_data()
+        finally:
+            loader.dispose()
+
+def _config_mtime() -> int:
+    """Obtener la fecha de modificación del YAML de configuración (0 si no existe)"""
+    try:
+        return os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+# Configuración de caché para configuración: se invalida al cambiar el fichero y
+# solo se conserva la versión vigente
+@st.cache_data(max_entries=1, show_spinner=False)
+def load_config(mtime_ns: int = 0):
     """Cargar configuración de ciudades"""
     try:
-        with open('config/config.yaml', 'r', encoding='utf-8') as file:
-            config = yaml.safe_load(file)
-            log_configuration_loaded(logger, "ciudades", cities_count=len(config.get('cities', [])))
-            return config
+        config = _read_config_file(CONFIG_PATH)
+        log_configuration_loaded(logger, "ciudades", cities_count=len(config.get('cities', [])))
+        return config
     except Exception as e:
-        log_operation_error(logger, "carga de configuración", e, config_file="config/config.yaml")
+        log_operation_error(logger, "carga de configuración", e, config_file=CONFIG_PATH)
         st.error(f"Error cargando configuración: {str(e)}")
         return None
 
+class DashboardState:
+    """Datos cargados y componentes derivados, compartidos por referencia entre reruns y sesiones"""
+    
+    def __init__(self):
+        self.data: Dict[str, pd.DataFrame] = {}
+        self.coords_hash: Optional[int] = None
+        self.lock = threading.Lock()
+
+# Misma caducidad que los loaders de DataManager: los datos compartidos se recargan con ellos
+@st.cache_resource(ttl=7200, max_entries=1)
+def _get_dashboard_state() -> DashboardState:
+    """Obtener el estado compartido del dashboard"""
+    return DashboardState()
+
+@st.cache_resource
+def _get_map_component(coords_hash: int, _coords: pd.DataFrame) -> 'AdvancedMapComponent':
+    """Obtener el componente de mapas compartido para un conjunto de coordenadas"""
+    # folium se importa solo cuando hace falta el primer mapa
+    from src.dashboard.map_component import AdvancedMapComponent
+    return AdvancedMapComponent(_coords)
+
+@st.cache_resource
+def _get_data_manager() -> DataManager:
+    """Obtener el gestor de datos compartido (sin estado por usuario)"""
+    return DataManager()
+
+@st.cache_resource
+def _get_chart_component() -> AdvancedChartComponent:
+    """Obtener el componente de gráficos compartido (sin estado por usuario)"""
+    return AdvancedChartComponent()
+
+def _build_map_component(state: DashboardState) -> Optional['AdvancedMapComponent']:
+    """Resolver el componente de mapas a partir del hash de las coordenadas"""
+    coords = state.data.get('coords')
+    if coords is None:
+        return None
+    # El hash se calcula una sola vez por conjunto de coordenadas cargado
+    if state.coords_hash is None:
+        state.coords_hash = int(pd.util.hash_pandas_object(coords, index=False).sum())
+    return _get_map_component(state.coords_hash, coords)
+
+# DataFrame vacío devuelto cuando no hay datos; los llamadores solo consultan .empty
+_EMPTY_DF: pd.DataFrame = pd.DataFrame()
+
+# Máximo de filas del resumen por ciudad enviadas al navegador por defecto
+CITY_SUMMARY_MAX_ROWS = 200
+
+# Tipos de datos de la tabla avanzada y su etiqueta
+_DATA_TYPES = (
+    ('summary', 'Resumen Anual'),
+    ('extreme', 'Días Extremos'),
+    ('trends', 'Tendencias'),
+    ('climate', 'Perfiles Climáticos'),
+    ('alerts', 'Alertas Meteorológicas'),
+    ('seasonal', 'Análisis Estacional'),
+    ('comparison', 'Comparación Climática'),
+)
+_DATA_TYPES_DICT = dict(_DATA_TYPES)
+_DATA_TYPES_KEYS = tuple(key for key, _ in _DATA_TYPES)
+
+# Claves de session_state gestionadas por el dashboard (se limpian al recargar)
+_MANAGED_KEYS = frozenset({'dashboard_initialized', 'filter_manager', 'analysis_context'})
+
+SIDEBAR_INFO_MARKDOWN = """
+**Versión:** 2.0  
+**Dev by:** @devarber  
+**Linkdn:**  https://www.linkedin.com/in/danielbarero/  
+**Github:**  https://github.com/devarber-beep
+"""
+
+@st.fragment
+def _render_sidebar_fragment(data_manager: DataManager, map_component: Optional['AdvancedMapComponent']):
+    """Renderizar información y controles del sidebar como fragmento independiente"""
+    st.markdown("---")
+    
+    # Información del sistema
+    st.header("Información")
+    st.markdown(SIDEBAR_INFO_MARKDOWN)
+    
+    # Botones de control
+    st.header("Controles")
+    if st.button("Recargar Datos"):
+        data_manager.clear_cache()
+        if map_component:
+            map_component.clear_cache()
+        # Descartar los datos compartidos para forzar su recarga
+        _get_dashboard_state.clear()
+        # Limpiar session_state
+        for key in _MANAGED_KEYS & st.session_state.keys():
+            del st.session_state[key]
+        st.rerun()
+
 class MeteoPandaDashboard:
     """Dashboard principal de MeteoPanda con arquitectura modular y desacoplada"""
     
+    # Páginas del navbar (en orden) y método que renderiza cada una
+    _PAGE_DISPATCH = {
+        "Dashboard Principal": "render_main_dashboard",
+        "Tabla de Datos": "render_data_table",
+        "Mapas Interactivos": "render_interactive_maps",
+        "Análisis de Tendencias": "render_trend_analysis",
+        "Análisis de Temperatura": "render_temperature_analysis",
+        "Análisis de Precipitación": "render_precipitation_analysis",
+        "Análisis Estacional": "render_seasonal_analysis",
+        "Alertas Meteorológicas": "render_alert_analysis",
+        "Comparación Climática": "render_climate_comparison",
+        "Configuración": "render_configuration",
+    }
+    # Opciones, iconos y estilos del navbar: constantes, no se reconstruyen en cada rerun
+    _PAGES = tuple(_PAGE_DISPATCH)
+    _NAVBAR_ICONS = ('house', 'table', 'map', 'trending-up', 'thermometer-half',
+                     'cloud-rain', 'calendar', 'exclamation-triangle', 'globe', 'gear')
+    _NAVBAR_STYLES = {
+        "container": {"padding": "0!important", "background-color": "#fafafa"},
+        "icon": {"color": "orange", "font-size": "16px"}, 
+        "nav-link": {
+            "font-size": "14px",
+            "text-align": "center",
+            "margin": "0px",
+            "--hover-color": "#eee"
+        },
+        "nav-link-selected": {"background-color": "#02ab21"},
+    }
+    
     def __init__(self):
         # Componentes concretos
-        self.data_manager = DataManager()
-        self.config = load_config()
+        self.data_manager = _get_data_manager()
+        self.config = load_config(_config_mtime())
         self.data = None
-        self.loaded_data_types = set()  # Track qué tipos de datos están cargados
         
         # Componentes de UI
         self.table_component = AdvancedTableComponent(items_per_page=50)
         self.map_component = None
-        self.chart_component = AdvancedChartComponent()
+        self.chart_component = _get_chart_component()
         
         # Componentes directos 
         self.filter_manager = None
@@ -78,6 +217,9 @@ class MeteoPandaDashboard:
         # Contexto de análisis
         self.analysis_context = None
         
+        # Estado de filtros calculado una vez por rerun (ver render_sidebar)
+        self._filters_tuple = ()
+        
         # Configuración de rendimiento
         self.performance_config = {
             'enable_lazy_loading': True,
@@ -88,13 +230,15 @@ class MeteoPandaDashboard:
     
     def initialize(self):
         """Inicializar el dashboard con lazy loading"""
+        # Los datos cargados se comparten entre reruns y sesiones por referencia
+        self.state = _get_dashboard_state()
+        
         # Verificar si ya está inicializado en session_state
-        if 'dashboard_initialized' in st.session_state and st.session_state['dashboard_initialized']:
-            logger.info("Dashboard ya inicializado, usando datos de session_state")
+        if st.session_state.get('dashboard_initialized') and self.state.data:
+            logger.debug("Dashboard ya inicializado, usando datos compartidos")
             # Usar datos ya cargados
-            self.data = st.session_state.get('dashboard_data', {})
-            self.loaded_data_types = st.session_state.get('loaded_data_types', set())
-            self.map_component = st.session_state.get('map_component')
+            self.data = self.state.data
+            self.map_component = _build_map_component(self.state)
             self.filter_manager = st.session_state.get('filter_manager')
             self.analysis_context = st.session_state.get('analysis_context')
             
@@ -106,19 +250,22 @@ class MeteoPandaDashboard:
         # Cargar solo datos esenciales
         log_operation_start(logger, "inicialización del dashboard")
         with st.spinner("Inicializando dashboard..."):
-            self.data = self.data_manager.get_essential_data()
-            
-            if self.data is None:
-                log_operation_error(logger, "inicialización del dashboard", Exception("No se pudieron cargar datos esenciales"))
-                st.error("Error al cargar los datos esenciales. Verifica la conexión a la base de datos.")
-                return False
+            # El estado es compartido entre sesiones: comprobar, cargar y guardar bajo el lock
+            with self.state.lock:
+                if not self.state.data:
+                    essential_data = self.data_manager.get_essential_data()
+                    
+                    if essential_data is None:
+                        log_operation_error(logger, "inicialización del dashboard", Exception("No se pudieron cargar datos esenciales"))
+                        st.error("Error al cargar los datos esenciales. Verifica la conexión a la base de datos.")
+                        return False
+                    
+                    self.state.data.update(essential_data)
             
-            # Marcar datos esenciales como cargados
-            self.loaded_data_types.update(['coords', 'summary'])
+            self.data = self.state.data
             
             # Inicializar componentes que dependen de datos esenciales
-            if self.data.get('coords') is not None:
-                self.map_component = AdvancedMapComponent(self.data['coords'])
+            self.map_component = _build_map_component(self.state)
             
             # Inicializar filtros con datos esenciales
             self.filter_manager = FilterManager(self.data)
@@ -133,44 +280,33 @@ class MeteoPandaDashboard:
                 self.chart_component
             )
             
-            # Guardar en session_state para evitar reinicializaciones
+            # Guardar en session_state solo el estado propio de la sesión
             st.session_state['dashboard_initialized'] = True
-            st.session_state['dashboard_data'] = self.data
-            st.session_state['loaded_data_types'] = self.loaded_data_types
-            st.session_state['map_component'] = self.map_component
             st.session_state['filter_manager'] = self.filter_manager
             st.session_state['analysis_context'] = self.analysis_context
             
             log_operation_success(logger, "inicialización del dashboard", 
-                                loaded_data_types=list(self.loaded_data_types),
+                                loaded_data_types=list(self.data),
                                 has_map_component=self.map_component is not None,
                                 has_filter_manager=self.filter_manager is not None)
             return True
 
     def get_data_lazy(self, data_type: str) -> pd.DataFrame:
         """Obtener datos con lazy loading real"""
-        # Si ya está cargado, devolverlo
-        if data_type in self.loaded_data_types and self.data.get(data_type) is not None:
-            return self.data[data_type]
-        
-        # Cargar bajo demanda
-        data = self.data_manager.get_data_on_demand(data_type)
-        if data is not None:
-            # Inicializar data si es None
-            if self.data is None:
-                self.data = {}
-            
-            # Guardar en cache local y session_state
-            self.data[data_type] = data
-            self.loaded_data_types.add(data_type)
+        # self.data es el dict del estado compartido: otras sesiones lo leen y escriben a la vez
+        with self.state.lock:
+            # Si ya está cargado, devolverlo (la presencia en self.data es la fuente de verdad)
+            cached = self.data.get(data_type)
+            if cached is not None:
+                return cached
             
-            # Actualizar session_state
-            st.session_state['dashboard_data'] = self.data
-            st.session_state['loaded_data_types'] = self.loaded_data_types
-            
-            return data
-        else:
-            return pd.DataFrame()  # Devolver DataFrame vacío si falla
+            # Cargar bajo demanda y guardar en el estado compartido
+            data = self.data_manager.get_data_on_demand(data_type)
+            if data is not None:
+                self.data[data_type] = data
+                return data
+        
+        return _EMPTY_DF  # DataFrame vacío compartido: no debe modificarse
     
     def render_header(self):
         """Renderizar cabecera del dashboard"""
@@ -178,95 +314,32 @@ class MeteoPandaDashboard:
     
     def render_sidebar(self):
         """Renderizar sidebar solo con filtros e información"""
-        with st.sidebar:           
-            # Renderizar filtros
-            if self.filter_manager:
-                rendered_filters = self.filter_manager.render_filters()
-            
-            st.markdown("---")
-            
-            # Información del sistema
-            st.header("Información")
-            st.write("**Versión:** 2.0")
-            st.write("**Dev by:** @devarber")
-            st.write("**Linkdn:**  https://www.linkedin.com/in/danielbarero/")
-            st.write("**Github:**  https://github.com/devarber-beep")
-
-
-            
-            # Botones de control
-            st.header("Controles")
-            if st.button("Recargar Datos"):
-                self.data_manager.clear_cache()
-                if self.map_component:
-                    self.map_component.clear_cache()
-                # Limpiar session_state
-                for key in ['dashboard_initialized', 'dashboard_data', 'loaded_data_types', 
-                           'map_component', 'filter_manager', 'analysis_context']:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.rerun()
+        # Los filtros se quedan fuera del fragmento: un cambio debe relanzar toda la app
+        if self.filter_manager:
+            rendered_filters = self.filter_manager.render_filters()
+            self._filters_tuple = self.filter_manager.get_filters_key()
+        
+        with st.sidebar:
+            _render_sidebar_fragment(self.data_manager, self.map_component)
     
 
     def render_navbar(self):
         """Renderizar navegación superior con option_menu y lazy loading"""
-        # Opciones del menú
-        menu_options = [
-            "Dashboard Principal",
-            "Tabla de Datos",
-            "Mapas Interactivos", 
-            "Análisis de Tendencias",
-            "Análisis de Temperatura",
-            "Análisis de Precipitación",
-            "Análisis Estacional",
-            "Alertas Meteorológicas",
-            "Comparación Climática",
-            "Configuración"
-        ]
+        from streamlit_option_menu import option_menu
         
         # Crear el navbar horizontal
         selected = option_menu(
             menu_title=None,
-            options=menu_options,
-            icons=['house', 'table', 'map', 'trending-up', 'thermometer-half', 
-                   'cloud-rain', 'calendar', 'exclamation-triangle', 'globe', 'gear'],
+            options=self._PAGES,
+            icons=self._NAVBAR_ICONS,
             menu_icon="cast",
             default_index=0,
             orientation="horizontal",
-            styles={
-                "container": {"padding": "0!important", "background-color": "#fafafa"},
-                "icon": {"color": "orange", "font-size": "16px"}, 
-                "nav-link": {
-                    "font-size": "14px",
-                    "text-align": "center",
-                    "margin": "0px",
-                    "--hover-color": "#eee"
-                },
-                "nav-link-selected": {"background-color": "#02ab21"},
-            }
+            styles=self._NAVBAR_STYLES
         )
         
         # Solo renderizar la página seleccionada (lazy loading)
-        if selected == "Dashboard Principal":
-            self.render_main_dashboard()
-        elif selected == "Tabla de Datos":
-            self.render_data_table()
-        elif selected == "Mapas Interactivos":
-            self.render_interactive_maps()
-        elif selected == "Análisis de Tendencias":
-            self.render_trend_analysis()
-        elif selected == "Análisis de Temperatura":
-            self.render_temperature_analysis()
-        elif selected == "Análisis de Precipitación":
-            self.render_precipitation_analysis()
-        elif selected == "Análisis Estacional":
-            self.render_seasonal_analysis()
-        elif selected == "Alertas Meteorológicas":
-            self.render_alert_analysis()
-        elif selected == "Comparación Climática":
-            self.render_climate_comparison()
-        elif selected == "Configuración":
-            self.render_configuration()
+        getattr(self, self._PAGE_DISPATCH[selected])()
     
     def render_main_dashboard(self):
         """Renderizar dashboard principal"""
@@ -279,43 +352,50 @@ class MeteoPandaDashboard:
         
         # Aplicar filtros a los datos del resumen
         summary_data = self.data['summary']
-        filtered_summary_data = self.filter_manager.apply_filters(summary_data)
+        filtered_summary_data = filter_dataframe_cached('summary', summary_data, self._filters_tuple)
         
         # KPIs principales
         self.chart_component.render_kpi_dashboard(filtered_summary_data, "KPIs Principales")
         
         # Mapa interactivo
         if self.map_component:
-            st.subheader("Vista General del Clima")
-            
-            col1, col2 = st.columns([1, 3])
-            
-            with col1:
-                map_type = self.map_component.render_map_selector("main")
-                metric = self.map_component.render_metric_selector(map_type, "main")
-            
-            with col2:
-                # Renderizar solo el mapa seleccionado con lazy loading real
-                if not filtered_summary_data.empty:
-                    self.map_component.render_map_with_lazy_loading(filtered_summary_data, metric, map_type, "main")
-                else:
-                    log_and_show_warning(logger, "No hay datos para mostrar en el mapa.", 
-                                       map_type=map_type, filtered_records=len(filtered_summary_data))
+            self._render_main_map_fragment(filtered_summary_data)
         
         # Resumen de datos por ciudad
         st.subheader("Resumen por Ciudad")
-        if not filtered_summary_data.empty:
-            city_summary = filtered_summary_data.groupby('city').agg({
-                'avg_temp': 'mean',
-                'total_precip': 'sum',
-                'avg_humidity': 'mean',
-                'year': 'count'
-            }).round(2)
+        # Agregación delegada en DuckDB: solo cruzan a Python las filas por ciudad
+        active_filters = self.filter_manager.active_filters if self.filter_manager else {}
+        city_summary = self.data_manager.get_city_summary(
+            year=active_filters.get('year'),
+            month=active_filters.get('month'),
+            region=active_filters.get('region'),
+            cities=tuple(active_filters.get('cities') or ())
+        )
+        if city_summary is not None and not city_summary.empty:
+            if len(city_summary) > CITY_SUMMARY_MAX_ROWS and not st.toggle("Mostrar todas las ciudades", key="city_summary_show_all"):
+                city_summary = city_summary.head(CITY_SUMMARY_MAX_ROWS)
             
-            city_summary.columns = ['Temp. Promedio (°C)', 'Precipitación Total (mm)', 
-                                  'Humedad Promedio (%)', 'Registros']
             st.dataframe(city_summary, use_container_width=True)
     
+    @st.fragment
+    def _render_main_map_fragment(self, filtered_summary_data: pd.DataFrame):
+        """Renderizar el mapa del dashboard principal; los selectores solo relanzan este bloque"""
+        st.subheader("Vista General del Clima")
+        
+        col1, col2 = st.columns([1, 3])
+        
+        with col1:
+            map_type = self.map_component.render_map_selector("main")
+            metric = self.map_component.render_metric_selector(map_type, "main")
+        
+        with col2:
+            # Renderizar solo el mapa seleccionado con lazy loading real
+            if not filtered_summary_data.empty:
+                self.map_component.render_map_with_lazy_loading(filtered_summary_data, metric, map_type, "main")
+            else:
+                log_and_show_warning(logger, "No hay datos para mostrar en el mapa.", 
+                                   map_type=map_type, filtered_records=len(filtered_summary_data))
+    
     def render_data_table(self):
         """Renderizar tabla de datos avanzada con paginación real"""
         st.header("Tabla de Datos Avanzada")
@@ -325,21 +405,10 @@ class MeteoPandaDashboard:
             self.table_component.set_data_manager(self.data_manager)
         
         # Selector de tipo de datos con key única para evitar recargas
-        data_types = {
-            'summary': 'Resumen Anual',
-            'extreme': 'Días Extremos',
-            'trends': 'Tendencias',
-            'climate': 'Perfiles Climáticos',
-            'alerts': 'Alertas Meteorológicas',
-            'seasonal': 'Análisis Estacional',
-            'comparison': 'Comparación Climática'
-        }
-        
-        # Usar key única para evitar re-renderizados
         selected_data_type = st.selectbox(
             "Tipo de Datos",
-            options=list(data_types.keys()),
-            format_func=lambda x: data_types[x],
+            options=_DATA_TYPES_KEYS,
+            format_func=_DATA_TYPES_DICT.__getitem__,
             help="Selecciona el tipo de datos a mostrar con paginación real",
             key="data_type_selector_main"
         )
@@ -352,7 +421,7 @@ class MeteoPandaDashboard:
             self.table_component.render_table_with_real_pagination(
                 data_type=selected_data_type,
                 filters=active_filters,
-                title=f"Tabla de {data_types[selected_data_type]}",
+                title=f"Tabla de {_DATA_TYPES_DICT[selected_data_type]}",
                 context="main"
             )
     
@@ -365,6 +434,11 @@ class MeteoPandaDashboard:
                              component="map_component", initialization_status="failed")
             return
         
+        self._render_interactive_map_fragment()
+    
+    @st.fragment
+    def _render_interactive_map_fragment(self):
+        """Renderizar selectores y mapa; un cambio de selector solo relanza este bloque"""
         # Selector de tipo de mapa con key única
         map_type = self.map_component.render_map_selector("interactive")
         
@@ -377,31 +451,18 @@ class MeteoPandaDashboard:
         # Renderizar mapa con lazy loading real - solo el seleccionado
         st.subheader("Visualización del Mapa")
         
-        # Crear clave de caché para los datos del mapa
-        map_cache_key = f"map_data_{map_type}_{metric}"
-        
-        # Verificar si los datos ya están en caché
-        if map_cache_key in st.session_state:
-            map_data = st.session_state[map_cache_key]
+        # Obtener datos con lazy loading según el tipo de mapa seleccionado
+        if map_type == 'alerts':
+            map_data_type = 'alerts'
+        elif map_type == 'comparison':
+            map_data_type = 'comparison'
         else:
-            # Obtener datos con lazy loading según el tipo de mapa seleccionado
-            if map_type == 'temperature':
-                map_data = self.get_data_lazy('summary')
-            elif map_type == 'precipitation':
-                map_data = self.get_data_lazy('summary')
-            elif map_type == 'alerts':
-                map_data = self.get_data_lazy('alerts')
-            elif map_type == 'comparison':
-                map_data = self.get_data_lazy('comparison')
-            else:
-                map_data = self.get_data_lazy('summary')
-            
-            # Aplicar filtros
-            if self.filter_manager and not map_data.empty:
-                map_data = self.filter_manager.apply_filters(map_data)
-            
-            # Guardar en caché
-            st.session_state[map_cache_key] = map_data
+            map_data_type = 'summary'
+        map_data = self.get_data_lazy(map_data_type)
+        
+        # Aplicar filtros: el resultado ya está memoizado por tipo de datos y filtros
+        if self.filter_manager and not map_data.empty:
+            map_data = filter_dataframe_cached(map_data_type, map_data, self._filters_tuple)
         
         # Renderizar solo el mapa seleccionado con lazy loading real
         if not map_data.empty:
@@ -419,6 +480,7 @@ class MeteoPandaDashboard:
         if not trends_data.empty:
             # Actualizar contexto de análisis con datos cargados
             self.analysis_context.data['trends'] = trends_data
+            from src.dashboard.analysis_strategies import TrendAnalysisStrategy
             strategy = TrendAnalysisStrategy()
             self.analysis_context.execute_analysis(strategy)
         else:
@@ -428,12 +490,14 @@ class MeteoPandaDashboard:
     def render_temperature_analysis(self):
         """Renderizar análisis específico de temperatura con lazy loading"""
         # Los datos de temperatura están en summary, ya cargados
+        from src.dashboard.analysis_strategies import TemperatureAnalysisStrategy
         strategy = TemperatureAnalysisStrategy()
         self.analysis_context.execute_analysis(strategy)
     
     def render_precipitation_analysis(self):
         """Renderizar análisis específico de precipitación con lazy loading"""
         # Los datos de precipitación están en summary, ya cargados
+        from src.dashboard.analysis_strategies import PrecipitationAnalysisStrategy
         strategy = PrecipitationAnalysisStrategy()
         self.analysis_context.execute_analysis(strategy)
     
@@ -444,6 +508,7 @@ class MeteoPandaDashboard:
         if not seasonal_data.empty:
             # Actualizar contexto de análisis con datos cargados
             self.analysis_context.data['seasonal'] = seasonal_data
+            from src.dashboard.analysis_strategies import SeasonalAnalysisStrategy
             strategy = SeasonalAnalysisStrategy()
             self.analysis_context.execute_analysis(strategy)
         else:
@@ -457,6 +522,7 @@ class MeteoPandaDashboard:
         if not alerts_data.empty:
             # Actualizar contexto de análisis con datos cargados
             self.analysis_context.data['alerts'] = alerts_data
+            from src.dashboard.analysis_strategies import AlertAnalysisStrategy
             strategy = AlertAnalysisStrategy()
             self.analysis_context.execute_analysis(strategy)
         else:
@@ -470,6 +536,7 @@ class MeteoPandaDashboard:
         if not comparison_data.empty:
             # Actualizar contexto de análisis con datos cargados
             self.analysis_context.data['comparison'] = comparison_data
+            from src.dashboard.analysis_strategies import ClimateComparisonStrategy
             strategy = ClimateComparisonStrategy()
             self.analysis_context.execute_analysis(strategy)
         else:
@@ -500,17 +567,16 @@ class MeteoPandaDashboard:
             
             # Información de datos
             if self.data:
-                data_info = self.data_manager.get_data_info()
-                st.write("**Datos disponibles:**")
-                for key, count in data_info.items():
-                    if count > 0:
-                        st.write(f"• {key}: {count}")
+                data_info = pd.Series(self.data_manager.get_data_info(), dtype='int64')
+                available = data_info[data_info > 0]
+                available_md = "\n".join(f"- {key}: {count}" for key, count in available.items())
+                st.markdown(f"**Datos disponibles:**\n\n{available_md}")
             
             # Información de configuración
             if self.config:
-                st.write("**Ciudades configuradas:**")
-                for city in self.config.get('cities', []):
-                    st.write(f"• {city['name']}")
+                names = [city['name'] for city in self.config.get('cities', [])]
+                cities_md = "\n".join(f"- {name}" for name in names)
+                st.markdown(f"**Ciudades configuradas:**\n\n{cities_md}")
     
     
     def run(self):
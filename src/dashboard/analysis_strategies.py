@@ -140,7 +140,7 @@ class AnalysisContext:
         
         # Aplicar filtros (lógica común)
         if self.filter_manager:
-            filtered_data = self.filter_manager.apply_filters(raw_data)
+            filtered_data = self.filter_manager.apply_filters_cached(data_key, raw_data)
         else:
             filtered_data = raw_data
         
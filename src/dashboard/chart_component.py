@@ -5,17 +5,24 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from typing import Dict, List, Optional, Any
 import numpy as np
 
 class AdvancedChartComponent:
     """Componente de gráficos avanzado con Plotly"""
     
+    # A partir de este número de puntos las series se dibujan con WebGL en lugar de SVG
+    WEBGL_MIN_POINTS = 1000
+    
     def __init__(self):
         self.color_palette = px.colors.qualitative.Set3
         self.template = "plotly_white"
     
+    def _line_trace(self, x, y, **kwargs):
+        """Crear traza de líneas/marcadores, con WebGL solo en series grandes"""
+        trace_class = go.Scattergl if len(x) >= self.WEBGL_MIN_POINTS else go.Scatter
+        return trace_class(x=x, y=y, **kwargs)
+    
     def render_temperature_trends(self, data: pd.DataFrame, title: str = "Tendencias de Temperatura"):
         """Renderizar gráfico de tendencias de temperatura"""
         if data.empty:
@@ -33,7 +40,7 @@ class AdvancedChartComponent:
                 yearly_temp = data.groupby('year')['avg_temp'].mean().reset_index()
                 fig1 = go.Figure()
                 fig1.add_trace(
-                    go.Scatter(
+                    self._line_trace(
                         x=yearly_temp['year'],
                         y=yearly_temp['avg_temp'],
                         mode='lines+markers',
@@ -99,23 +106,31 @@ class AdvancedChartComponent:
             
             # Gráfico 4: Evolución temporal por ciudad
             if all(col in data.columns for col in ['year', 'avg_temp', 'city']):
-                fig4 = go.Figure()
                 cities = data['city'].unique()[:5]  # Mostrar solo las primeras 5 ciudades
                 colors = px.colors.qualitative.Set3
                 
+                # Una sola agrupación (ciudad, año) en lugar de una máscara booleana por ciudad
+                yearly_by_city = (
+                    data[data['city'].isin(cities)]
+                    .groupby(['city', 'year'], observed=True)['avg_temp']
+                    .mean()
+                )
+                
+                # Trazas construidas de una vez: la figura se valida una sola vez
+                traces = []
                 for i, city in enumerate(cities):
-                    city_data = data[data['city'] == city]
-                    city_yearly = city_data.groupby('year')['avg_temp'].mean().reset_index()
-                    fig4.add_trace(
-                        go.Scatter(
-                            x=city_yearly['year'],
-                            y=city_yearly['avg_temp'],
+                    city_yearly = yearly_by_city.loc[city]
+                    traces.append(
+                        self._line_trace(
+                            x=city_yearly.index,
+                            y=city_yearly.values,
                             mode='lines+markers',
                             name=city,
                             line=dict(width=2, color=colors[i % len(colors)]),
                             marker=dict(size=6)
                         )
                     )
+                fig4 = go.Figure(data=traces)
                 
                 fig4.update_layout(
                     title="Evolución Temporal por Ciudad",
@@ -163,7 +178,7 @@ class AdvancedChartComponent:
             
             # Gráfico 3: Días de lluvia por ciudad
             if all(col in data.columns for col in ['city', 'total_precip']):
-                rainy_days = data[data['total_precip'] > 0].groupby('city').size().reset_index(name='dias_lluvia')
+                rainy_days = data[data['total_precip'] > 0].groupby('city', observed=True).size().reset_index(name='dias_lluvia')
                 rainy_days = rainy_days.sort_values('dias_lluvia', ascending=True)
                 fig3 = go.Figure()
                 fig3.add_trace(
@@ -321,19 +336,18 @@ class AdvancedChartComponent:
                 for col in ['avg_temp_season', 'total_precip_season', 'avg_humidity_season']:
                     season_avg[col] = (season_avg[col] - season_avg[col].min()) / (season_avg[col].max() - season_avg[col].min()) * 100
                 
-                fig4 = go.Figure()
                 colors = px.colors.qualitative.Set3
                 
-                for i, (_, row) in enumerate(season_avg.iterrows()):
-                    fig4.add_trace(
-                        go.Scatterpolar(
-                            r=[row['avg_temp_season'], row['total_precip_season'], row['avg_humidity_season']],
-                            theta=['Temperatura', 'Precipitación', 'Humedad'],
-                            fill='toself',
-                            name=row['season'],
-                            line_color=colors[i % len(colors)]
-                        )
+                fig4 = go.Figure(data=[
+                    go.Scatterpolar(
+                        r=[row.avg_temp_season, row.total_precip_season, row.avg_humidity_season],
+                        theta=['Temperatura', 'Precipitación', 'Humedad'],
+                        fill='toself',
+                        name=row.season,
+                        line_color=colors[i % len(colors)]
                     )
+                    for i, row in enumerate(season_avg.itertuples(index=False))
+                ])
                 
                 fig4.update_layout(
                     title="Comparación Estacional",
@@ -383,7 +397,8 @@ class AdvancedChartComponent:
             
             # Gráfico 3: Alertas por ciudad
             if 'city' in data.columns:
-                city_alerts = data['city'].value_counts().reset_index()
+                city_counts = data['city'].value_counts()
+                city_alerts = city_counts[city_counts > 0].reset_index()
                 city_alerts.columns = ['Ciudad', 'Alertas']
                 city_alerts = city_alerts.head(10)  # Top 10 ciudades
                 fig3 = go.Figure()
@@ -431,14 +446,13 @@ class AdvancedChartComponent:
             
             # Gráfico 4: Evolución temporal
             if 'date' in data.columns:
-                data_copy = data.copy()
-                data_copy['date'] = pd.to_datetime(data_copy['date'])
-                data_copy['month_year'] = data_copy['date'].dt.to_period('M')
-                monthly_alerts = data_copy.groupby('month_year').size().reset_index(name='alertas')
+                # Agrupar por la serie de periodos sin copiar el DataFrame completo
+                month_year = pd.to_datetime(data['date']).dt.to_period('M').rename('month_year')
+                monthly_alerts = month_year.groupby(month_year).size().reset_index(name='alertas')
                 monthly_alerts['month_year'] = monthly_alerts['month_year'].astype(str)
                 fig4 = go.Figure()
                 fig4.add_trace(
-                    go.Scatter(
+                    self._line_trace(
                         x=monthly_alerts['month_year'],
                         y=monthly_alerts['alertas'],
                         mode='lines+markers',
@@ -671,41 +685,23 @@ class AdvancedChartComponent:
             'alert_change': 0
         }
         
-        # Temperatura
-        if 'avg_temp' in data.columns:
-            kpis['avg_temp'] = data['avg_temp'].mean()
-            if 'year' in data.columns:
-                years = sorted(data['year'].unique())
-                if len(years) >= 2:
-                    current_year = years[-1]
-                    previous_year = years[-2]
-                    current_temp = data[data['year'] == current_year]['avg_temp'].mean()
-                    previous_temp = data[data['year'] == previous_year]['avg_temp'].mean()
-                    kpis['temp_change'] = current_temp - previous_temp
-        
-        # Precipitación
-        if 'total_precip' in data.columns:
-            kpis['total_precip'] = data['total_precip'].sum()
-            if 'year' in data.columns:
-                years = sorted(data['year'].unique())
-                if len(years) >= 2:
-                    current_year = years[-1]
-                    previous_year = years[-2]
-                    current_precip = data[data['year'] == current_year]['total_precip'].sum()
-                    previous_precip = data[data['year'] == previous_year]['total_precip'].sum()
-                    kpis['precip_change'] = current_precip - previous_precip
-        
-        # Humedad
-        if 'avg_humidity' in data.columns:
-            kpis['avg_humidity'] = data['avg_humidity'].mean()
-            if 'year' in data.columns:
-                years = sorted(data['year'].unique())
-                if len(years) >= 2:
-                    current_year = years[-1]
-                    previous_year = years[-2]
-                    current_humidity = data[data['year'] == current_year]['avg_humidity'].mean()
-                    previous_humidity = data[data['year'] == previous_year]['avg_humidity'].mean()
-                    kpis['humidity_change'] = current_humidity - previous_humidity
+        # Agregación por año en una sola pasada para las variaciones interanuales
+        kpi_columns = {
+            'avg_temp': ('avg_temp', 'mean', 'temp_change'),
+            'total_precip': ('total_precip', 'sum', 'precip_change'),
+            'avg_humidity': ('avg_humidity', 'mean', 'humidity_change')
+        }
+        present = {kpi: spec for kpi, spec in kpi_columns.items() if spec[0] in data.columns}
+        
+        yearly = None
+        if present and 'year' in data.columns:
+            yearly = data.groupby('year').agg({column: func for column, func, _ in present.values()})
+        
+        # Temperatura, precipitación y humedad
+        for kpi, (column, func, change_key) in present.items():
+            kpis[kpi] = data[column].agg(func)
+            if yearly is not None and len(yearly) >= 2:
+                kpis[change_key] = yearly[column].iloc[-1] - yearly[column].iloc[-2]
         
         # Alertas
         if 'overall_alert' in data.columns:
@@ -11,40 +11,52 @@ from ..utils.logging_config import get_logger, log_operation_start, log_operatio
 # Configurar logger
 logger = get_logger("data_manager")
 
+# Columnas de texto repetido que se cargan como categoría
+CATEGORY_COLUMNS = ('city', 'region', 'station')
+
+# Métricas climáticas que se cargan en float32 (precisión de 0.01 de sobra)
+FLOAT32_COLUMNS = ('avg_temp', 'avg_humidity', 'total_precip')
+
+# Coordenadas únicas por ciudad (carga del mapa y conteo del panel de información)
+COORDINATES_QUERY = """
+    SELECT DISTINCT city, lat, lon 
+    FROM gold.city_yearly_summary
+    WHERE lat IS NOT NULL AND lon IS NOT NULL
+"""
+
+@st.cache_resource
+def _get_shared_connection(db_path: str) -> duckdb.DuckDBPyConnection:
+    """Abrir la base de datos en solo lectura una sola vez por proceso y ruta"""
+    # El dashboard nunca escribe: en solo lectura otros procesos pueden abrir el fichero para leer
+    connection = duckdb.connect(db_path, read_only=True)
+    log_database_operation(logger, "conectar", "meteopanda.duckdb", db_path=db_path)
+    return connection
+
 class DataManager:
     """Gestor centralizado de datos con caché y manejo de errores"""
     
     def __init__(self, db_path: str = 'meteopanda.duckdb'):
         self.db_path = db_path
-        self.connection = None
     
     def get_connection(self) -> duckdb.DuckDBPyConnection:
-        """Obtener conexión a la base de datos con manejo de errores"""
+        """Obtener un cursor nuevo sobre la conexión compartida; quien lo pide lo cierra"""
         try:
-            if self.connection is None:
-                self.connection = duckdb.connect(self.db_path)
-                log_database_operation(logger, "conectar", "meteopanda.duckdb", db_path=self.db_path)
-            return self.connection
+            return _get_shared_connection(self.db_path).cursor()
         except Exception as e:
             log_operation_error(logger, "conexión a base de datos", e, db_path=self.db_path)
             st.error(f"Error de conexión: {str(e)}")
             return None
     
-    def close_connection(self):
-        """Cerrar conexión a la base de datos"""
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            log_database_operation(logger, "desconectar", "meteopanda.duckdb")
-    
-    def execute_query(self, query: str) -> Optional[pd.DataFrame]:
+    def execute_query(self, query: str, params: Optional[List[Any]] = None) -> Optional[pd.DataFrame]:
         """Ejecutar consulta con manejo de errores"""
         try:
             con = self.get_connection()
             if con is None:
                 return None
             
-            result = con.execute(query).df()
+            # El cursor se cierra al terminar la consulta
+            with con:
+                result = con.execute(query, params).df()
             log_database_operation(logger, "consulta", "query", affected_rows=len(result), query_preview=query[:50])
             return result
             
@@ -53,51 +65,98 @@ class DataManager:
             st.error(f"Error en consulta: {str(e)}")
             return None
     
+    @staticmethod
+    def _compact_dtypes(data: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Convertir texto repetido a categoría y métricas climáticas a float32"""
+        # Ciudad, región y estación como categoría: códigos enteros en lugar de cadenas por fila;
+        # las métricas en float32 ocupan la mitad de memoria en filtros y agregaciones
+        if data is not None:
+            dtypes = {col: 'category' for col in CATEGORY_COLUMNS if col in data.columns}
+            dtypes.update({col: 'float32' for col in FLOAT32_COLUMNS if col in data.columns})
+            if dtypes:
+                data = data.astype(dtypes)
+        return data
+    
     @st.cache_data(ttl=7200)
     def load_summary_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de resumen anual"""
-        return _self.execute_query("SELECT * FROM gold.city_yearly_summary")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.city_yearly_summary"))
     
     @st.cache_data(ttl=7200)
     def load_extreme_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de días extremos"""
-        return _self.execute_query("SELECT * FROM gold.city_extreme_days")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.city_extreme_days"))
     
     @st.cache_data(ttl=7200)
     def load_trends_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de tendencias"""
-        return _self.execute_query("SELECT * FROM gold.weather_trends")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.weather_trends"))
     
     @st.cache_data(ttl=7200)
     def load_climate_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de perfiles climáticos"""
-        return _self.execute_query("SELECT * FROM gold.climate_profiles")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.climate_profiles"))
     
     @st.cache_data(ttl=7200)
     def load_coordinates_data(_self) -> Optional[pd.DataFrame]:
         """Cargar coordenadas de ciudades"""
-        return _self.execute_query(
-            """
-            SELECT DISTINCT city, lat, lon 
-            FROM silver.weather_cleaned
-            WHERE lat IS NOT NULL AND lon IS NOT NULL
-            """
-        )
+        data = _self.execute_query(COORDINATES_QUERY)
+        if data is not None:
+            # Tipos compactos: menos bytes que recorrer al hashear las coordenadas
+            data = data.astype({'city': 'category', 'lat': 'float32', 'lon': 'float32'})
+        return data
     
     @st.cache_data(ttl=7200)
     def load_alerts_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de alertas meteorológicas"""
-        return _self.execute_query("SELECT * FROM gold.weather_alerts")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.weather_alerts"))
     
     @st.cache_data(ttl=7200)
     def load_seasonal_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de análisis estacional"""
-        return _self.execute_query("SELECT * FROM gold.seasonal_analysis")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.seasonal_analysis"))
     
     @st.cache_data(ttl=7200)
     def load_comparison_data(_self) -> Optional[pd.DataFrame]:
         """Cargar datos de comparación climática"""
-        return _self.execute_query("SELECT * FROM gold.climate_comparison")
+        return _self._compact_dtypes(_self.execute_query("SELECT * FROM gold.climate_comparison"))
+    
+    @st.cache_data(ttl=300)
+    def get_city_summary(_self, year: Optional[str] = None, month: Optional[str] = None,
+                         region: Optional[str] = None, cities: Tuple[str, ...] = ()) -> Optional[pd.DataFrame]:
+        """Resumen por ciudad agregado en DuckDB con los filtros como parámetros"""
+        conditions = []
+        params = []
+        
+        if year:
+            conditions.append("year = ?")
+            params.append(str(year))
+        if month:
+            conditions.append("month = ?")
+            params.append(int(month))
+        if region:
+            conditions.append("region = ?")
+            params.append(region)
+        if cities:
+            conditions.append("list_contains(?, city)")
+            params.append(list(cities))
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            SELECT city,
+                   ROUND(AVG(avg_temp), 2) AS "Temp. Promedio (°C)",
+                   ROUND(SUM(total_precip), 2) AS "Precipitación Total (mm)",
+                   ROUND(AVG(avg_humidity), 2) AS "Humedad Promedio (%)",
+                   COUNT(*) AS "Registros"
+            FROM gold.city_yearly_summary
+            {where_clause}
+            GROUP BY city
+            ORDER BY city
+        """
+        result = _self.execute_query(query, params)
+        if result is not None:
+            result = result.set_index('city')
+        return result
     
     @st.cache_data(ttl=7200)
     def get_essential_data(_self) -> Dict[str, pd.DataFrame]:
@@ -169,12 +228,17 @@ class DataManager:
     @st.cache_data(ttl=7200)
     def get_data_info(_self) -> Dict[str, int]:
         """Obtener información sobre los datos cargados"""
-        data = _self.get_all_data()
+        # Conteos calculados en DuckDB: no se materializan las tablas completas
+        data_queries = {
+            key: COORDINATES_QUERY if key == 'coords' else _self._get_base_query(key)
+            for key in ('summary', 'extreme', 'trends', 'climate', 'coords', 'alerts', 'seasonal', 'comparison')
+        }
         info = {}
         
-        for key, df in data.items():
-            if df is not None:
-                info[key] = len(df)
+        for key, query in data_queries.items():
+            result = _self.execute_query(f"SELECT COUNT(*) AS total FROM ({query})")
+            if result is not None:
+                info[key] = int(result['total'].iloc[0])
             else:
                 info[key] = 0
         
@@ -205,36 +269,34 @@ class DataManager:
             # Construir consulta base
             base_query = self._get_base_query(data_type)
             
-            # Añadir filtros
-            where_clause = self._build_where_clause(filters)
+            # Añadir filtros como parámetros de la consulta preparada
+            where_clause, params = self._build_where_clause(filters)
             if where_clause:
                 base_query += f" WHERE {where_clause}"
             
-            # Añadir ordenamiento
-            if sort_by:
-                order_direction = "ASC" if sort_ascending else "DESC"
-                base_query += f" ORDER BY {sort_by} {order_direction}"
-            
             # Calcular offset y limit
             offset = (page - 1) * items_per_page
             limit = items_per_page
             
-            # Consulta de conteo total
-            count_query = f"SELECT COUNT(*) as total FROM ({base_query}) as count_query"
-            
-            # Consulta paginada
-            paginated_query = f"{base_query} LIMIT {limit} OFFSET {offset}"
-            
-            # Ejecutar consultas
             con = self.get_connection()
             if con is None:
                 return pd.DataFrame(), self._get_empty_metadata()
             
-            # Obtener total de registros
-            total_count = con.execute(count_query).fetchone()[0]
-            
-            # Obtener datos paginados
-            paginated_data = con.execute(paginated_query).df()
+            # El cursor se cierra una vez materializada la página
+            with con:
+                # Relación DuckDB: el conteo y la página comparten la consulta filtrada
+                relation = con.sql(base_query, params=params or None)
+                
+                # Obtener total de registros (sin ordenar)
+                total_count = relation.aggregate("COUNT(*)").fetchone()[0]
+                
+                # Añadir ordenamiento solo a la página
+                if sort_by:
+                    order_direction = "ASC" if sort_ascending else "DESC"
+                    relation = relation.order(f"{sort_by} {order_direction}")
+                
+                # Materializar únicamente la página visible
+                paginated_data = relation.limit(limit, offset).df()
             
             # Calcular metadatos de paginación
             total_pages = (total_count + items_per_page - 1) // items_per_page
@@ -276,55 +338,39 @@ class DataManager:
         
         return queries.get(data_type, "SELECT * FROM gold.city_yearly_summary")
     
-    def _build_where_clause(self, filters: Optional[Dict]) -> str:
-        """Construir cláusula WHERE basada en filtros"""
+    def _build_where_clause(self, filters: Optional[Dict]) -> Tuple[str, List[Any]]:
+        """Construir cláusula WHERE parametrizada basada en filtros"""
         if not filters:
-            return ""
+            return "", []
         
         conditions = []
+        params = []
+        
+        # Columnas de igualdad / pertenencia para cada filtro
+        column_filters = {'year': 'year', 'month': 'month', 'cities': 'city', 'region': 'region'}
+        # Columnas de rango para los filtros meteorológicos
+        range_filters = {'min_temp': ('avg_temp', '>='), 'max_temp': ('avg_temp', '<='), 'max_precip': ('total_precip', '<=')}
         
         for key, value in filters.items():
-            if value is None or value == []:
+            if value is None or (isinstance(value, (list, tuple)) and not value):
                 continue
-                
-            if key == 'year':
-                if isinstance(value, list):
-                    years_str = ','.join(map(str, value))
-                    conditions.append(f"year IN ({years_str})")
-                else:
-                    conditions.append(f"year = {value}")
-            
-            elif key == 'month':
-                if isinstance(value, list):
-                    months_str = ','.join(map(str, value))
-                    conditions.append(f"month IN ({months_str})")
-                else:
-                    conditions.append(f"month = {value}")
             
-            elif key == 'cities':
-                if isinstance(value, list):
-                    cities_str = "','".join(value)
-                    conditions.append(f"city IN ('{cities_str}')")
+            if key in column_filters:
+                column = column_filters[key]
+                if isinstance(value, (list, tuple)):
+                    placeholders = ', '.join('?' * len(value))
+                    conditions.append(f"{column} IN ({placeholders})")
+                    params.extend(value)
                 else:
-                    conditions.append(f"city = '{value}'")
-            
-            elif key == 'region':
-                if isinstance(value, list):
-                    regions_str = "','".join(value)
-                    conditions.append(f"region IN ('{regions_str}')")
-                else:
-                    conditions.append(f"region = '{value}'")
-            
-            elif key == 'min_temp':
-                conditions.append(f"avg_temp >= {value}")
-            
-            elif key == 'max_temp':
-                conditions.append(f"avg_temp <= {value}")
+                    conditions.append(f"{column} = ?")
+                    params.append(value)
             
-            elif key == 'max_precip':
-                conditions.append(f"total_precip <= {value}")
+            elif key in range_filters:
+                column, operator = range_filters[key]
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
         
-        return " AND ".join(conditions) if conditions else ""
+        return " AND ".join(conditions), params
     
     def _get_empty_metadata(self) -> Dict[str, Any]:
         """Obtener metadatos vacíos para casos de error"""
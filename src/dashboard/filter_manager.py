@@ -3,7 +3,8 @@ Gestor de filtros para el dashboard con validaciones y opciones avanzadas
 """
 import streamlit as st
 import pandas as pd
-from typing import Dict, List, Optional, Any
+import weakref
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 
 class FilterManager:
@@ -13,6 +14,7 @@ class FilterManager:
         self.data = data
         self.summary = data.get('summary', pd.DataFrame()) if data else pd.DataFrame()
         self.active_filters = {}
+        self._filter_options = None
     
     def render_filters(self) -> Dict[str, Any]:
         """Renderizar filtros en sidebar con validaciones"""
@@ -37,14 +39,21 @@ class FilterManager:
             return self.active_filters
     
     def _get_filter_options(self) -> Dict[str, List]:
-        """Obtener opciones disponibles para los filtros"""
+        """Obtener opciones disponibles para los filtros (calculadas una vez por gestor)"""
+        if self._filter_options is None:
+            self._filter_options = self._compute_filter_options()
+        return self._filter_options
+    
+    def _compute_filter_options(self) -> Dict[str, List]:
+        """Calcular opciones disponibles para los filtros a partir del resumen"""
         options = {
             'years': [],
             'months': [],
             'regions': [],
             'cities': [],
             'seasons': ['Invierno', 'Primavera', 'Verano', 'Otoño'],
-            'alert_levels': ['Normal', 'ALERTA AMARILLA', 'ALERTA NARANJA', 'ALERTA ROJA']
+            'alert_levels': ['Normal', 'ALERTA AMARILLA', 'ALERTA NARANJA', 'ALERTA ROJA'],
+            'region_cities': {}
         }
         
         # Verificar que self.summary existe y no está vacío
@@ -52,8 +61,12 @@ class FilterManager:
             try:
                 options['years'] = sorted(self.summary['year'].unique().tolist())
                 options['months'] = sorted(self.summary['month'].unique().tolist())
-                options['regions'] = sorted(self.summary['region'].unique().tolist())
-                options['cities'] = sorted(self.summary['city'].unique().tolist())
+                options['regions'] = _sorted_unique(self.summary['region'])
+                options['cities'] = _sorted_unique(self.summary['city'])
+                options['region_cities'] = {
+                    region: sorted(cities.unique().tolist())
+                    for region, cities in self.summary.groupby('region', observed=True)['city']
+                }
             except (KeyError, AttributeError):
                 # Si hay algún error al acceder a las columnas, mantener las opciones por defecto
                 pass
@@ -116,13 +129,9 @@ class FilterManager:
         )
         
         # Filtro de ciudades
-        if selected_region != 'Todas' and self.summary is not None and not self.summary.empty:
-            try:
-                # Filtrar ciudades por región seleccionada
-                region_cities = self.summary[self.summary['region'] == selected_region]['city'].unique()
-                available_cities = sorted(region_cities)
-            except (KeyError, AttributeError):
-                available_cities = options['cities']
+        if selected_region != 'Todas' and selected_region in options['region_cities']:
+            # Ciudades de la región seleccionada (precalculadas)
+            available_cities = options['region_cities'][selected_region]
         else:
             available_cities = options['cities']
         
@@ -228,43 +237,99 @@ class FilterManager:
     
 
     
+    def get_filters_key(self) -> tuple:
+        """Obtener una representación hashable de los filtros activos"""
+        return tuple(sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in self.active_filters.items()
+        ))
+    
     def apply_filters(self, df: pd.DataFrame) -> pd.DataFrame:
         """Aplicar filtros a un DataFrame"""
-        if df.empty:
-            return df
-        
-        # Si no hay filtros activos, devolver todos los datos
-        if not self.active_filters or all(v is None or v == [] for v in self.active_filters.values()):
-            return df
-        
-        filtered_df = df.copy()
-        
-        # Aplicar filtros de fecha
-        if self.active_filters.get('year'):
-            filtered_df = filtered_df[filtered_df['year'] == int(self.active_filters['year'])]
-        
-        if self.active_filters.get('month'):
-            filtered_df = filtered_df[filtered_df['month'] == int(self.active_filters['month'])]
-        
-        # Aplicar filtros de ubicación
-        if self.active_filters.get('region') and 'region' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['region'] == self.active_filters['region']]
-        
-        if self.active_filters.get('cities') and 'city' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['city'].isin(self.active_filters['cities'])]
-        
-        # Aplicar filtros meteorológicos
-        if self.active_filters.get('min_temp') and 'temp_max_c' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['temp_max_c'] >= self.active_filters['min_temp']]
-        
-        if self.active_filters.get('max_temp') and 'temp_max_c' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['temp_max_c'] <= self.active_filters['max_temp']]
-        
-        if self.active_filters.get('max_precip') and 'precip_mm' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['precip_mm'] <= self.active_filters['max_precip']]
-        
-        # Aplicar filtros de fuente
-        if self.active_filters.get('source') and 'source' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['source'] == self.active_filters['source']]
-        
-        return filtered_df
+        return filter_dataframe(df, self.active_filters)
+    
+    def apply_filters_cached(self, data_type: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Aplicar filtros reutilizando el resultado memoizado para este tipo de datos"""
+        return filter_dataframe_cached(data_type, df, self.get_filters_key())
+
+def _sorted_unique(column: pd.Series) -> List:
+    """Valores únicos ordenados de una columna, sin recorrerla si es categórica"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Las categorías ya son los valores únicos ordenados
+        return column.cat.remove_unused_categories().cat.categories.tolist()
+    return sorted(column.unique().tolist())
+
+def _has_active_filters(filters: Dict[str, Any]) -> bool:
+    """Comprobar si algún filtro tiene valor (None y listas vacías no filtran)"""
+    return any(v is not None and not (isinstance(v, (list, tuple)) and not v) for v in filters.values())
+
+def filter_dataframe(df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
+    """Aplicar un conjunto de filtros a un DataFrame"""
+    if df.empty:
+        return df
+    
+    # Si no hay filtros activos, devolver todos los datos
+    if not _has_active_filters(filters):
+        return df
+    
+    # Construir una única máscara y seleccionar una sola vez, sin copias intermedias
+    mask = pd.Series(True, index=df.index)
+    
+    # Aplicar filtros de fecha
+    if filters.get('year'):
+        # El valor se convierte una vez al tipo de la columna (BIGINT en alertas y estacional,
+        # VARCHAR en el resto) en lugar de convertir la columna entera a texto
+        year = filters['year']
+        mask &= df['year'] == (int(year) if pd.api.types.is_integer_dtype(df['year']) else str(year))
+    
+    if filters.get('month'):
+        mask &= df['month'] == int(filters['month'])
+    
+    # Aplicar filtros de ubicación
+    if filters.get('region') and 'region' in df.columns:
+        mask &= df['region'] == filters['region']
+    
+    if filters.get('cities') and 'city' in df.columns:
+        mask &= df['city'].isin(filters['cities'])
+    
+    # Aplicar filtros meteorológicos
+    if filters.get('min_temp') and 'temp_max_c' in df.columns:
+        mask &= df['temp_max_c'] >= filters['min_temp']
+    
+    if filters.get('max_temp') and 'temp_max_c' in df.columns:
+        mask &= df['temp_max_c'] <= filters['max_temp']
+    
+    if filters.get('max_precip') and 'precip_mm' in df.columns:
+        mask &= df['precip_mm'] <= filters['max_precip']
+    
+    # Aplicar filtros de fuente
+    if filters.get('source') and 'source' in df.columns:
+        mask &= df['source'] == filters['source']
+    
+    return df[mask]
+
+# Hash del contenido por DataFrame de origen: id -> (weakref, hash), una vez por objeto cargado
+_frame_hashes: Dict[int, Tuple[weakref.ref, int]] = {}
+
+def _frame_hash(df: pd.DataFrame) -> int:
+    """Obtener el hash del contenido de un DataFrame, calculado una sola vez mientras siga vivo"""
+    key = id(df)
+    entry = _frame_hashes.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    value = int(pd.util.hash_pandas_object(df, index=True).sum())
+    # Al liberarse el DataFrame se descarta su entrada, antes de que el id pueda reutilizarse
+    _frame_hashes[key] = (weakref.ref(df, lambda _ref, key=key: _frame_hashes.pop(key, None)), value)
+    return value
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _filter_dataframe_memo(data_type: str, frame_hash: int, _df: pd.DataFrame, filters_key: tuple) -> pd.DataFrame:
+    """Filtrar memoizando por contenido de origen y filtros; el resultado se comparte y no debe modificarse"""
+    return filter_dataframe(_df, dict(filters_key))
+
+def filter_dataframe_cached(data_type: str, df: pd.DataFrame, filters_key: tuple) -> pd.DataFrame:
+    """Aplicar filtros memoizando el resultado por tipo de datos, datos de origen y estado de filtros"""
+    # Sin filtros activos se devuelve el propio DataFrame, sin pasar por la caché
+    if df.empty or not _has_active_filters(dict(filters_key)):
+        return df
+    return _filter_dataframe_memo(data_type, _frame_hash(df), df, filters_key)
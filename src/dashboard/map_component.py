@@ -6,6 +6,8 @@ import pandas as pd
 import folium
 from typing import Dict, List, Optional, Any
 import numpy as np
+import threading
+from collections import OrderedDict
 
 # Importar plugins de folium con manejo de errores
 try:
@@ -19,23 +21,55 @@ class AdvancedMapComponent:
     
     def __init__(self, coords_df: pd.DataFrame):
         self.coords_df = coords_df
+        # Diccionario ciudad -> (lat, lon): búsqueda O(1) por marcador (primera fila por ciudad)
+        unique_coords = coords_df.drop_duplicates('city')
+        self.coords_lookup = {
+            city: (float(lat), float(lon))
+            for city, lat, lon in zip(unique_coords['city'], unique_coords['lat'], unique_coords['lon'])
+        }
+        # Nombre visible de cada ciudad, capitalizado una sola vez y no por marcador
+        self.city_labels = {city: str(city).capitalize() for city in self.coords_lookup}
         self.map_center = [40.4168, -3.7038]  # Centrado en Madrid (centro de España)
         self.default_zoom = 6
-        self.map_cache = {}
+        # Caché LRU compartida entre sesiones (el componente es un cache_resource)
+        self.map_cache: OrderedDict = OrderedDict()
         self.data_cache = {}
         self.max_cache_size = 50  # Máximo 50 mapas en caché
+        self.lock = threading.Lock()
     
     def render_map(self, data: pd.DataFrame, metric: str = 'avg_temp', 
                    map_type: str = 'temperature', height: int = 600) -> folium.Map:
         """Renderizar mapa con métricas y funcionalidades avanzadas - optimizado con caché inteligente"""
         
-        # Crear clave única para el caché del mapa
+        # Crear clave única para el caché del mapa (incluye el hash de los datos)
         cache_key = self._create_cache_key(data, metric, map_type)
         
-        # Verificar si el mapa ya está en caché y es válido
-        if self._is_cached_map_valid(cache_key, data):
-            return self.map_cache[cache_key]['map']
+        # Verificar si el mapa ya está en caché: la clave ya identifica los datos
+        cached = self._get_cached_map(cache_key)
+        if cached is not None:
+            return cached['map']
+        
+        return self._build_map(data, metric, map_type, cache_key)
+    
+    def render_map_html(self, data: pd.DataFrame, metric: str = 'avg_temp', 
+                        map_type: str = 'temperature') -> str:
+        """Obtener el HTML del mapa, renderizado con Jinja una sola vez por clave de caché"""
+        cache_key = self._create_cache_key(data, metric, map_type)
         
+        cached = self._get_cached_map(cache_key)
+        if cached is None:
+            m = self._build_map(data, metric, map_type, cache_key)
+            cached = self._get_cached_map(cache_key)
+            if cached is None:
+                # Mapa sin datos: no se guarda en caché
+                return m.get_root().render()
+        
+        if cached.get('html') is None:
+            cached['html'] = cached['map'].get_root().render()
+        return cached['html']
+    
+    def _build_map(self, data: pd.DataFrame, metric: str, map_type: str, cache_key: str) -> folium.Map:
+        """Construir el mapa con sus marcadores y guardarlo en caché"""
         # Crear nuevo mapa
         m = self._create_base_map(map_type)
         
@@ -46,6 +80,12 @@ class AdvancedMapComponent:
         # Procesar solo los datos necesarios para este tipo de mapa
         processed_data = self._process_data_for_map_type(data, map_type)
         
+        # Métricas cargadas en float32: a float64 con los 2 decimales de origen para que
+        # tooltips y popups no muestren el ruido de representación (11.760000228881836)
+        float32_columns = processed_data.select_dtypes('float32').columns
+        if len(float32_columns):
+            processed_data = processed_data.astype(dict.fromkeys(float32_columns, 'float64')).round(dict.fromkeys(float32_columns, 2))
+        
         # Añadir marcadores según el tipo de mapa (solo con datos procesados)
         if map_type == 'temperature':
             self._add_temperature_markers(m, processed_data, metric)
@@ -60,7 +100,7 @@ class AdvancedMapComponent:
         self._add_map_controls(m)
         
         # Guardar en caché inteligente
-        self._cache_map(cache_key, m, data)
+        self._cache_map(cache_key, m, map_type)
         
         return m
     
@@ -78,19 +118,24 @@ class AdvancedMapComponent:
             location=_self.map_center,
             zoom_start=_self.default_zoom,
             tiles=tile_options.get(map_type, 'CartoDB positron'),
-            control_scale=True
+            control_scale=True,
+            # Renderer canvas: los CircleMarker se dibujan en un único lienzo, no un nodo SVG cada uno
+            prefer_canvas=True
         )
         
         return m
     
     def _add_temperature_markers(self, m: folium.Map, data: pd.DataFrame, metric: str):
         """Añadir marcadores de temperatura"""
-        for _, row in data.iterrows():
+        # Marcadores agrupados en una capa que se añade al mapa una sola vez
+        feature_group = folium.FeatureGroup(name="Temperatura", control=False)
+        for row in data.to_dict('records'):
             city_name = row['city']
-            city_coords = self.coords_df[self.coords_df['city'] == city_name]
+            city_coords = self.coords_lookup.get(city_name)
             
-            if not city_coords.empty:
-                lat, lon = city_coords.iloc[0]['lat'], city_coords.iloc[0]['lon']
+            if city_coords is not None:
+                lat, lon = city_coords
+                city_label = self.city_labels[city_name]
                 value = row.get(metric, 'N/A')
                 
                 # Color basado en la temperatura
@@ -100,10 +145,10 @@ class AdvancedMapComponent:
                 radius = self._get_marker_radius(value, metric)
                 
                 # Popup con información detallada
-                popup_html = self._create_temperature_popup(row, city_name)
+                popup_html = self._create_temperature_popup(row, city_label)
                 
                 # Tooltip con información rápida
-                tooltip_text = f"{city_name.capitalize()}: {value}°C"
+                tooltip_text = f"{city_label}: {value}°C"
                 
                 folium.CircleMarker(
                     location=[lat, lon],
@@ -114,16 +159,21 @@ class AdvancedMapComponent:
                     fill=True,
                     fillOpacity=0.7,
                     weight=2
-                ).add_to(m)
+                ).add_to(feature_group)
+        
+        feature_group.add_to(m)
     
     def _add_precipitation_markers(self, m: folium.Map, data: pd.DataFrame, metric: str):
         """Añadir marcadores de precipitación"""
-        for _, row in data.iterrows():
+        # Marcadores agrupados en una capa que se añade al mapa una sola vez
+        feature_group = folium.FeatureGroup(name="Precipitación", control=False)
+        for row in data.to_dict('records'):
             city_name = row['city']
-            city_coords = self.coords_df[self.coords_df['city'] == city_name]
+            city_coords = self.coords_lookup.get(city_name)
             
-            if not city_coords.empty:
-                lat, lon = city_coords.iloc[0]['lat'], city_coords.iloc[0]['lon']
+            if city_coords is not None:
+                lat, lon = city_coords
+                city_label = self.city_labels[city_name]
                 value = row.get(metric, 'N/A')
                 
                 # Color basado en la precipitación
@@ -133,10 +183,10 @@ class AdvancedMapComponent:
                 radius = self._get_marker_radius(value, metric)
                 
                 # Popup con información detallada
-                popup_html = self._create_precipitation_popup(row, city_name)
+                popup_html = self._create_precipitation_popup(row, city_label)
                 
                 # Tooltip
-                tooltip_text = f"{city_name.capitalize()}: {value} mm"
+                tooltip_text = f"{city_label}: {value} mm"
                 
                 folium.CircleMarker(
                     location=[lat, lon],
@@ -147,16 +197,21 @@ class AdvancedMapComponent:
                     fill=True,
                     fillOpacity=0.7,
                     weight=2
-                ).add_to(m)
+                ).add_to(feature_group)
+        
+        feature_group.add_to(m)
     
     def _add_alert_markers(self, m: folium.Map, data: pd.DataFrame):
         """Añadir marcadores de alertas"""
-        for _, row in data.iterrows():
+        # Marcadores agrupados en una capa que se añade al mapa una sola vez
+        feature_group = folium.FeatureGroup(name="Alertas", control=False)
+        for row in data.to_dict('records'):
             city_name = row['city']
-            city_coords = self.coords_df[self.coords_df['city'] == city_name]
+            city_coords = self.coords_lookup.get(city_name)
             
-            if not city_coords.empty:
-                lat, lon = city_coords.iloc[0]['lat'], city_coords.iloc[0]['lon']
+            if city_coords is not None:
+                lat, lon = city_coords
+                city_label = self.city_labels[city_name]
                 alert_level = row.get('overall_alert', 'Normal')
                 severity = row.get('alert_severity', 1)
                 
@@ -167,10 +222,10 @@ class AdvancedMapComponent:
                 radius = 8 + (severity * 2)
                 
                 # Popup con información de alerta
-                popup_html = self._create_alert_popup(row, city_name)
+                popup_html = self._create_alert_popup(row, city_label)
                 
                 # Tooltip
-                tooltip_text = f"{city_name.capitalize()}: {alert_level}"
+                tooltip_text = f"{city_label}: {alert_level}"
                 
                 folium.CircleMarker(
                     location=[lat, lon],
@@ -181,16 +236,21 @@ class AdvancedMapComponent:
                     fill=True,
                     fillOpacity=0.8,
                     weight=3
-                ).add_to(m)
+                ).add_to(feature_group)
+        
+        feature_group.add_to(m)
     
     def _add_comparison_markers(self, m: folium.Map, data: pd.DataFrame):
         """Añadir marcadores para comparación climática"""
-        for _, row in data.iterrows():
+        # Marcadores agrupados en una capa que se añade al mapa una sola vez
+        feature_group = folium.FeatureGroup(name="Comparación Climática", control=False)
+        for row in data.to_dict('records'):
             city_name = row['city']
-            city_coords = self.coords_df[self.coords_df['city'] == city_name]
+            city_coords = self.coords_lookup.get(city_name)
             
-            if not city_coords.empty:
-                lat, lon = city_coords.iloc[0]['lat'], city_coords.iloc[0]['lon']
+            if city_coords is not None:
+                lat, lon = city_coords
+                city_label = self.city_labels[city_name]
                 climate_type = row.get('climate_classification', 'Desconocido')
                 avg_temp = row.get('avg_temp_city', 'N/A')
                 
@@ -201,10 +261,10 @@ class AdvancedMapComponent:
                 radius = self._get_climate_radius(avg_temp)
                 
                 # Popup con información climática
-                popup_html = self._create_climate_popup(row, city_name)
+                popup_html = self._create_climate_popup(row, city_label)
                 
                 # Tooltip
-                tooltip_text = f"{city_name.capitalize()}: {climate_type}"
+                tooltip_text = f"{city_label}: {climate_type}"
                 
                 folium.CircleMarker(
                     location=[lat, lon],
@@ -215,7 +275,9 @@ class AdvancedMapComponent:
                     fill=True,
                     fillOpacity=0.7,
                     weight=2
-                ).add_to(m)
+                ).add_to(feature_group)
+        
+        feature_group.add_to(m)
     
     def _get_temperature_color(self, value) -> str:
         """Obtener color basado en la temperatura"""
@@ -301,11 +363,11 @@ class AdvancedMapComponent:
         except:
             return 10
     
-    def _create_temperature_popup(self, row: pd.Series, city_name: str) -> str:
+    def _create_temperature_popup(self, row: Dict[str, Any], city_label: str) -> str:
         """Crear popup HTML para marcadores de temperatura"""
         return f"""
         <div style="width: 250px;">
-            <h4>🌡️ {city_name.capitalize()}</h4>
+            <h4>🌡️ {city_label}</h4>
             <hr>
             <p><b>🌡️ Temperatura Promedio:</b> {row.get('avg_temp', 'N/A')}°C</p>
             <p><b>🔥 Temperatura Máxima:</b> {row.get('max_temp', 'N/A')}°C</p>
@@ -317,11 +379,11 @@ class AdvancedMapComponent:
         </div>
         """
     
-    def _create_precipitation_popup(self, row: pd.Series, city_name: str) -> str:
+    def _create_precipitation_popup(self, row: Dict[str, Any], city_label: str) -> str:
         """Crear popup HTML para marcadores de precipitación"""
         return f"""
         <div style="width: 250px;">
-            <h4>🌧️ {city_name.capitalize()}</h4>
+            <h4>🌧️ {city_label}</h4>
             <hr>
             <p><b>🌧️ Precipitación Total:</b> {row.get('total_precip', 'N/A')} mm</p>
             <p><b>🌡️ Temperatura Promedio:</b> {row.get('avg_temp', 'N/A')}°C</p>
@@ -332,11 +394,11 @@ class AdvancedMapComponent:
         </div>
         """
     
-    def _create_alert_popup(self, row: pd.Series, city_name: str) -> str:
+    def _create_alert_popup(self, row: Dict[str, Any], city_label: str) -> str:
         """Crear popup HTML para marcadores de alertas"""
         return f"""
         <div style="width: 250px;">
-            <h4>⚠️ {city_name.capitalize()}</h4>
+            <h4>⚠️ {city_label}</h4>
             <hr>
             <p><b>🚨 Alerta General:</b> {row.get('overall_alert', 'N/A')}</p>
             <p><b>🌡️ Alerta Temperatura:</b> {row.get('temperature_alert', 'N/A')}</p>
@@ -349,11 +411,11 @@ class AdvancedMapComponent:
         </div>
         """
     
-    def _create_climate_popup(self, row: pd.Series, city_name: str) -> str:
+    def _create_climate_popup(self, row: Dict[str, Any], city_label: str) -> str:
         """Crear popup HTML para marcadores climáticos"""
         return f"""
         <div style="width: 250px;">
-            <h4>🌍 {city_name.capitalize()}</h4>
+            <h4>🌍 {city_label}</h4>
             <hr>
             <p><b>🌡️ Temperatura Promedio:</b> {row.get('avg_temp_city', 'N/A')}°C</p>
             <p><b>🌧️ Precipitación Total:</b> {row.get('total_precip_city', 'N/A')} mm</p>
@@ -424,32 +486,13 @@ class AdvancedMapComponent:
             index=current_index
         )
         
-        # Actualizar session state solo si cambió
+        # Actualizar session state solo si cambió; el HTML cacheado de otros tipos se conserva
+        # para que volver a un mapa ya visto sea un acierto de caché
         if selected_map != st.session_state[map_key]:
             st.session_state[map_key] = selected_map
-            # Limpiar caché específico del mapa anterior
-            self._clear_map_cache_for_type(context, selected_map)
         
         return selected_map
     
-    def _clear_map_cache_for_type(self, context: str, map_type: str):
-        """Limpiar caché específico para un tipo de mapa"""
-        # Limpiar caché de datos del mapa en session_state
-        keys_to_remove = [k for k in st.session_state.keys() 
-                         if k.startswith(f"map_data_{map_type}") or 
-                            k.startswith(f"cached_map_{context}_{map_type}") or
-                            k.startswith(f"rendered_map_{context}_{map_type}")]
-        
-        for key in keys_to_remove:
-            if key in st.session_state:
-                del st.session_state[key]
-        
-        # Limpiar caché interno del componente
-        keys_to_remove = [k for k in self.map_cache.keys() if map_type in k]
-        for key in keys_to_remove:
-            if key in self.map_cache:
-                del self.map_cache[key]
-    
     def render_metric_selector(self, map_type: str, context: str = "main") -> str:
         """Renderizar selector de métrica según el tipo de mapa"""
         if map_type == 'temperature':
@@ -488,13 +531,11 @@ class AdvancedMapComponent:
                 processed_data = self._process_data_for_map_type(data, map_type)
                 
                 if not processed_data.empty:
-                    map_obj = self.render_map(processed_data, metric, map_type)
-                    
-                    # Usar st_folium con configuración optimizada para evitar recargas
-                    from streamlit_folium import st_folium
-                    # Key estable que no cambia con interacciones
-                    map_component_key = f"map_{context}_{map_type}_{metric}_static"
-                    st_folium(map_obj, height=600, width=1000, key=map_component_key, returned_objects=[])
+                    # HTML pre-renderizado y cacheado: el coste de las plantillas se paga una vez
+                    # por combinación de tipo, métrica y datos (no se consumen eventos del mapa)
+                    import streamlit.components.v1 as components
+                    map_html = self.render_map_html(processed_data, metric, map_type)
+                    components.html(map_html, height=600, width=1000)
                 else:
                     st.warning(f"No hay datos procesados disponibles para el mapa de {map_type}")
             else:
@@ -551,14 +592,9 @@ class AdvancedMapComponent:
         relevant_columns = self._get_relevant_columns(map_type, data)
         filtered_data = data[relevant_columns] if relevant_columns else data
         
-        # Crear hash de los datos filtrados
-        try:
-            data_str = str(filtered_data.values.tobytes()) + str(filtered_data.index.tolist())
-            return str(hash(data_str))[:8]
-        except (AttributeError, TypeError):
-            # Fallback para índices que no soportan tobytes()
-            data_str = str(filtered_data.values.tobytes()) + str(filtered_data.index.values.tolist())
-            return str(hash(data_str))[:8]
+        # Hash vectorizado por filas (incluye el índice), sin serializar los valores a str
+        row_hashes = pd.util.hash_pandas_object(filtered_data, index=True).values
+        return format(int(row_hashes.sum()) ^ len(row_hashes), 'x')
     
     def _get_relevant_columns(self, map_type: str, data: pd.DataFrame = None) -> List[str]:
         """Obtener columnas relevantes según el tipo de mapa, solo las que existen en los datos"""
@@ -586,36 +622,30 @@ class AdvancedMapComponent:
         return required_cols
     
     
-    def _is_cached_map_valid(self, cache_key: str, data: pd.DataFrame) -> bool:
-        """Verificar si el mapa en caché es válido"""
-        if cache_key not in self.map_cache:
-            return False
-        
-        cached_data = self.map_cache[cache_key]['data']
-        current_data_hash = self._create_data_hash(data, self.map_cache[cache_key]['map_type'])
-        
-        return cached_data == current_data_hash
+    def _get_cached_map(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Obtener un mapa de la caché marcándolo como usado recientemente"""
+        with self.lock:
+            cached = self.map_cache.get(cache_key)
+            if cached is not None:
+                self.map_cache.move_to_end(cache_key)
+            return cached
     
-    def _cache_map(self, cache_key: str, map_obj: folium.Map, data: pd.DataFrame):
+    def _cache_map(self, cache_key: str, map_obj: folium.Map, map_type: str):
         """Guardar mapa en caché con límite de tamaño"""
-        # Limpiar caché si está lleno
-        if len(self.map_cache) >= self.max_cache_size:
-            # Eliminar el 20% más antiguo
-            keys_to_remove = list(self.map_cache.keys())[:self.max_cache_size // 5]
-            for key in keys_to_remove:
-                del self.map_cache[key]
-        
-        # Guardar nuevo mapa
-        self.map_cache[cache_key] = {
-            'map': map_obj,
-            'data': self._create_data_hash(data, cache_key.split('_')[0]),
-            'map_type': cache_key.split('_')[0],
-            'timestamp': st.session_state.get('_map_timestamp', 0)
-        }
-        st.session_state['_map_timestamp'] = st.session_state.get('_map_timestamp', 0) + 1
+        with self.lock:
+            self.map_cache[cache_key] = {
+                'map': map_obj,
+                'html': None,
+                'map_type': map_type
+            }
+            self.map_cache.move_to_end(cache_key)
+            # Descartar los mapas menos usados recientemente
+            while len(self.map_cache) > self.max_cache_size:
+                self.map_cache.popitem(last=False)
     
     def clear_cache(self):
         """Limpiar caché de mapas"""
-        self.map_cache.clear()
-        self.data_cache.clear()
+        with self.lock:
+            self.map_cache.clear()
+            self.data_cache.clear()
     
@@ -477,13 +477,18 @@ class AdvancedTableComponent:
     
     def _format_numeric_columns(self, table_data: pd.DataFrame):
         """Formatear columnas numéricas"""
-        numeric_columns = [col for col in table_data.columns if any(keyword in col for keyword in ['Temp.', 'Precipitación', 'Humedad', 'Latitud', 'Longitud'])]
-        
-        for col in numeric_columns:
-            if col in table_data.columns:
-                table_data[col] = pd.to_numeric(table_data[col], errors='ignore')
-                if table_data[col].dtype in ['float64', 'int64']:
-                    table_data[col] = table_data[col].round(2)
+        # Los tipos ya vienen de DuckDB: se redondean de una vez las columnas numéricas,
+        # las de texto (p. ej. alertas) se dejan intactas
+        numeric_columns = [
+            col for col in table_data.columns
+            if any(keyword in col for keyword in ['Temp.', 'Precipitación', 'Humedad', 'Latitud', 'Longitud'])
+            and table_data[col].dtype in ['float32', 'float64', 'int64']
+        ]
+        
+        if numeric_columns:
+            # float32 pasa a float64 antes de redondear para mostrar los 2 decimales exactos
+            float32_columns = {col: 'float64' for col in numeric_columns if table_data[col].dtype == 'float32'}
+            table_data[numeric_columns] = table_data[numeric_columns].astype(float32_columns).round(2)
     
     
     
@@ -1,75 +1,113 @@
+import os
+import hashlib
 import duckdb
 import pandas as pd
-from itertools import product
+
+# Asegúrate de que esta ruta sea correcta para tu base de datos DuckDB
+DB_PATH = 'data/meteopanda.duckdb'
+
+# Conexión de solo lectura compartida por todas las verificaciones del proceso
+_global_con = None
 
 def get_connection():
-    # Asegúrate de que esta ruta sea correcta para tu base de datos DuckDB
-    return duckdb.connect(database='data/meteopanda.duckdb', read_only=True)
+    """Obtener un cursor sobre la conexión compartida (catálogo y buffer pool comunes)"""
+    global _global_con
+    if _global_con is None:
+        _global_con = duckdb.connect(database=DB_PATH, read_only=True)
+    return _global_con.cursor()
+
+# Producto cartesiano de ciudades, años y meses presentes en gold.city_extreme_days
+EXPECTED_COMBINATIONS_CTE = """
+    WITH expected AS (
+        SELECT c.city, y.year, m.month
+        FROM (SELECT DISTINCT city FROM gold.city_extreme_days) c
+        CROSS JOIN (SELECT DISTINCT year FROM gold.city_extreme_days) y
+        CROSS JOIN (SELECT DISTINCT month FROM gold.city_extreme_days) m
+    )
+"""
+
+# Resultados de diagnóstico cacheados en Parquet para ejecuciones repetidas
+CACHE_DIR = 'exports/.check_data_cache'
+
+
+def cached_query(con, sql, params=None):
+    """Ejecutar consulta reutilizando su resultado en Parquet mientras la base de datos no cambie"""
+    # La clave es la consulta con sus parámetros: cambiar cualquiera de los dos no reutiliza el resultado
+    key = hashlib.sha256(repr((sql, params)).encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(CACHE_DIR, f"{key}.parquet")
+    
+    # Solo vale si es posterior a la última escritura de la base de datos (p. ej. un ETL nuevo)
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(DB_PATH):
+        return pd.read_parquet(path)
+    
+    df = con.execute(sql, params).df()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df.to_parquet(path, index=False)
+    return df
 
-con = get_connection()
 
-try:
-    df_extreme = con.execute("SELECT * FROM gold.city_extreme_days").df()
-    print("--- Verificando df_extreme ---")
+def verificar_extremos(con):
+    """Verificar nulos y combinaciones faltantes en gold.city_extreme_days"""
+    print("--- Verificando gold.city_extreme_days ---")
 
     # 1. Contar filas y columnas
-    print(f"Filas: {df_extreme.shape[0]}, Columnas: {df_extreme.shape[1]}")
+    num_rows, num_columns = con.execute("""
+        SELECT
+            (SELECT count(*) FROM gold.city_extreme_days),
+            (SELECT count(*) FROM information_schema.columns
+             WHERE table_schema = 'gold' AND table_name = 'city_extreme_days')
+    """).fetchone()
+    print(f"Filas: {num_rows}, Columnas: {num_columns}")
 
     # 2. Verificar valores nulos en columnas clave
     print("\nValores nulos por columna (en las columnas relevantes):")
     null_columns = ['max_temp_month', 'min_temp_month', 'total_precip_month']
-    
-    # Asegurarse de que las columnas existen antes de intentar acceder a ellas
-    existing_null_columns = [col for col in null_columns if col in df_extreme.columns]
-    
-    if not existing_null_columns:
-        print("Las columnas clave (max_temp_month, min_temp_month, total_precip_month) no se encontraron en el DataFrame.")
-        print("Por favor, asegúrate de que gold.city_extreme_days ha sido actualizado en tu datamart.")
-    else:
-        null_counts = df_extreme[existing_null_columns].isnull().sum()
-        null_counts_filtered = null_counts[null_counts > 0]
+    null_counts = pd.Series(
+        con.execute("""
+            SELECT
+                count(*) FILTER (WHERE max_temp_month IS NULL),
+                count(*) FILTER (WHERE min_temp_month IS NULL),
+                count(*) FILTER (WHERE total_precip_month IS NULL)
+            FROM gold.city_extreme_days
+        """).fetchone(),
+        index=null_columns
+    )
+    null_counts_filtered = null_counts[null_counts > 0]
+
+    if not null_counts_filtered.empty:
+        print(null_counts_filtered)
         
-        if not null_counts_filtered.empty:
-            print(null_counts_filtered)
-        else:
-            print("No hay valores nulos en columnas clave.")
+        # La relación es perezosa: el LIMIT detiene el escaneo en cuanto hay 20 filas
+        null_rows = con.sql("""
+            SELECT city, year, month, max_temp_month, min_temp_month, total_precip_month
+            FROM gold.city_extreme_days
+            WHERE max_temp_month IS NULL
+               OR min_temp_month IS NULL
+               OR total_precip_month IS NULL
+        """)
+        print("\nDetalle de valores nulos (primeras 20 filas):")
+        print(null_rows.limit(20).df())
+    else:
+        print("No hay valores nulos en columnas clave.")
 
     # 3. Verificar combinaciones (city, year, month) faltantes
-    existing_combinations = df_extreme[['city', 'year', 'month']].drop_duplicates()
-
-    all_cities = df_extreme['city'].unique()
-    all_years = df_extreme['year'].unique()
-    all_months = df_extreme['month'].unique()
-
-    expected_combinations = pd.DataFrame(list(product(all_cities, all_years, all_months)), columns=['city', 'year', 'month'])
-
-    # Encontrar combinaciones faltantes usando merge con indicator
-    merged = pd.merge(expected_combinations, existing_combinations, on=['city', 'year', 'month'], how='left', indicator=True)
-    missing_combinations = merged[merged['_merge'] == 'left_only'][['city', 'year', 'month']]
+    missing_combinations = con.execute(f"""
+        {EXPECTED_COMBINATIONS_CTE}
+        SELECT * FROM (
+            SELECT city, year, month FROM expected
+            EXCEPT
+            SELECT city, year, month FROM gold.city_extreme_days
+        )
+        ORDER BY city, year, month
+    """).df()
 
     print("\nCombinaciones (ciudad, año, mes) faltantes:")
     if not missing_combinations.empty:
         print(f"Se encontraron {len(missing_combinations)} combinaciones faltantes.")
         
-        # Obtener los detalles de los valores nulos para estas combinaciones
-        df_all_data = pd.merge(expected_combinations, df_extreme, on=['city', 'year', 'month'], how='left')
-        
-        # Filtrar para mostrar solo las combinaciones que faltan
-        missing_data_details = df_all_data[
-            df_all_data['city'].isin(missing_combinations['city']) & 
-            df_all_data['year'].isin(missing_combinations['year']) & 
-            df_all_data['month'].isin(missing_combinations['month'])
-        ]
-
-        # Verificar valores nulos en las columnas clave
-        if existing_null_columns:
-            missing_data_details = missing_data_details[missing_data_details[existing_null_columns].isnull().any(axis=1)]
-            
-            if not missing_data_details.empty:
-                print("\nDetalle de valores nulos para las combinaciones faltantes (primeras 20 filas):")
-                print(missing_data_details[['city', 'year', 'month'] + existing_null_columns].head(20))
-            else:
-                print("\nLas combinaciones faltantes están completamente ausentes (no son NaNs en un registro existente).")
+        # Las combinaciones faltantes no tienen registro en la tabla, no son NaNs en un registro existente
+        print("\nCombinaciones completamente ausentes (primeras 20 filas):")
+        print(missing_combinations.head(20))
         
         print("\nSi hay muchas combinaciones faltantes, esto podría ser la causa del problema de visualización.")
     else:
@@ -77,43 +115,44 @@ try:
 
     # 4. Verificar específicamente el caso de Sevilla en enero de 2021
     print("\n--- Verificando caso específico de Sevilla en enero de 2021 ---")
-    
+
     # Verificar en gold.city_extreme_days
     print("\n1. Datos en gold.city_extreme_days:")
     sevilla_jan_2021 = con.execute("""
         SELECT *
         FROM gold.city_extreme_days
-        WHERE year = 2021
-        AND month = 1
-        AND city = 'sevilla'
+        WHERE year = ?
+        AND month = ?
+        AND city = ?
         ORDER BY year, month
-    """).df()
-    
-    if not sevilla_jan_2021.empty:
+    """, [2021, 1, 'sevilla']).fetchall()
+
+    if sevilla_jan_2021:
         print("\nDatos encontrados para Sevilla en enero de 2021:")
-        print(sevilla_jan_2021)
+        for row in sevilla_jan_2021:
+            print(row)
     else:
         print("No se encontraron datos para Sevilla en enero de 2021 en gold.city_extreme_days")
 
     # Verificar en gold.extreme_days
     print("\n2. Datos en gold.city_extreme_days:")
-    extreme_days_jan_2021 = con.execute("""
+    extreme_days_jan_2021 = cached_query(con, """
         SELECT *
         FROM gold.city_extreme_days
-        WHERE year = 2021
-        AND month = 1
+        WHERE year = ?
+        AND month = ?
         ORDER BY year, month
-    """).df()
-    
+    """, [2021, 1])
+
     if not extreme_days_jan_2021.empty:
         print("\nDatos encontrados en gold.city_extreme_days para enero de 2021:")
         print(extreme_days_jan_2021)
     else:
         print("No se encontraron datos para enero de 2021 en gold.city_extreme_days")
-        
+    
     # Verificar los datos originales en silver.weather_cleaned
     print("\n3. Verificando datos originales en silver.weather_cleaned:")
-    original_data = con.execute("""
+    original_data = cached_query(con, """
         SELECT 
             city,
             EXTRACT(YEAR FROM date) as year,
@@ -122,14 +161,15 @@ try:
             temp_max_c,
             precip_mm
         FROM silver.weather_cleaned
-        WHERE city = 'sevilla'
-        AND EXTRACT(YEAR FROM date) = 2021
-        AND EXTRACT(MONTH FROM date) = 1
+        WHERE city = ?
+        AND EXTRACT(YEAR FROM date) = ?
+        AND EXTRACT(MONTH FROM date) = ?
         ORDER BY date
-    """).df()
+    """, ['sevilla', 2021, 1])
     print("\nDatos originales:")
     print(original_data)
 
 
-finally:
-    con.close()
+if __name__ == "__main__":
+    with get_connection() as con:
+        verificar_extremos(con)
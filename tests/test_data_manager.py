@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Pruebas del gestor de datos del dashboard sobre una base DuckDB pequeña de prueba
+"""
+
+import sys
+import os
+
+import duckdb
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dashboard.data_manager import DataManager
+
+# Filas de gold.city_yearly_summary: year es VARCHAR como en la tabla real
+SUMMARY_ROWS = [
+    # city, region, year, month, avg_temp, total_precip, avg_humidity
+    ('Sevilla', 'Andalucia', '2021', 1, 11.31, 40.2, 71.4),
+    ('Sevilla', 'Andalucia', '2021', 7, 28.77, 0.0, 38.9),
+    ('Sevilla', 'Andalucia', '2022', 1, 12.03, 55.6, None),
+    ('Cordoba', 'Andalucia', '2021', 1, 9.86, 61.3, 75.2),
+    ('Cordoba', 'Andalucia', '2022', 7, 29.41, 1.2, 33.7),
+    ('Girona', 'Cataluña', '2021', 1, 6.12, 80.7, 79.3),
+    ('Girona', 'Cataluña', '2022', 1, 7.44, 92.1, 81.6),
+]
+
+SUMMARY_COLUMNS = ['Temp. Promedio (°C)', 'Precipitación Total (mm)', 'Humedad Promedio (%)', 'Registros']
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    """DataManager sobre una base DuckDB temporal con gold.city_yearly_summary"""
+    db_path = str(tmp_path / 'test.duckdb')
+    con = duckdb.connect(db_path)
+    con.execute("CREATE SCHEMA gold")
+    con.execute("""
+        CREATE TABLE gold.city_yearly_summary (
+            city VARCHAR, region VARCHAR, year VARCHAR, month INTEGER,
+            avg_temp DOUBLE, total_precip DOUBLE, avg_humidity DOUBLE
+        )
+    """)
+    con.executemany("INSERT INTO gold.city_yearly_summary VALUES (?, ?, ?, ?, ?, ?, ?)", SUMMARY_ROWS)
+    con.close()
+
+    # La caché de get_city_summary no incluye la instancia en la clave
+    DataManager.get_city_summary.clear()
+    return DataManager(db_path=db_path)
+
+
+@pytest.fixture
+def summary_df():
+    """Las mismas filas como DataFrame para calcular el resultado de referencia"""
+    return pd.DataFrame(SUMMARY_ROWS, columns=['city', 'region', 'year', 'month',
+                                               'avg_temp', 'total_precip', 'avg_humidity'])
+
+
+def pandas_city_summary(df, year=None, month=None, region=None, cities=()):
+    """Resumen por ciudad calculado con pandas, como hacía el dashboard antes de delegarlo en DuckDB"""
+    if year:
+        df = df[df['year'].astype(str) == str(year)]
+    if month:
+        df = df[df['month'] == int(month)]
+    if region:
+        df = df[df['region'] == region]
+    if cities:
+        df = df[df['city'].isin(cities)]
+
+    city_summary = df.groupby('city').agg({
+        'avg_temp': 'mean',
+        'total_precip': 'sum',
+        'avg_humidity': 'mean',
+        'year': 'count'
+    }).round(2)
+    city_summary.columns = SUMMARY_COLUMNS
+    return city_summary
+
+
+def assert_matches_pandas(result, expected):
+    """Comparar el resumen de DuckDB con el de referencia: índice, columnas y valores redondeados"""
+    assert result.index.name == 'city'
+    assert list(result.columns) == SUMMARY_COLUMNS
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_city_summary_sin_filtros(data_manager, summary_df):
+    """Sin filtros se agregan todas las filas, una por ciudad y ordenadas por ciudad"""
+    result = data_manager.get_city_summary()
+
+    assert list(result.index) == ['Cordoba', 'Girona', 'Sevilla']
+    assert result.loc['Sevilla', 'Temp. Promedio (°C)'] == 17.37
+    assert result.loc['Sevilla', 'Humedad Promedio (%)'] == 55.15
+    assert result.loc['Sevilla', 'Registros'] == 3
+    assert_matches_pandas(result, pandas_city_summary(summary_df))
+
+
+@pytest.mark.parametrize('filters', [
+    {'year': '2021'},
+    {'year': 2022},
+    {'month': '1'},
+    {'region': 'Andalucia'},
+    {'cities': ('Sevilla', 'Girona')},
+    {'year': '2021', 'month': 1, 'region': 'Andalucia', 'cities': ('Sevilla',)},
+])
+def test_city_summary_con_filtros(data_manager, summary_df, filters):
+    """Cada filtro, y su combinación, da el mismo resultado que la agregación con pandas"""
+    result = data_manager.get_city_summary(**filters)
+    assert_matches_pandas(result, pandas_city_summary(summary_df, **filters))
+
+
+def test_city_summary_filtro_sin_coincidencias(data_manager):
+    """Un filtro sin filas devuelve un resumen vacío"""
+    result = data_manager.get_city_summary(year='1999')
+    assert result is not None
+    assert result.empty
+
+
+def test_where_clause_sin_filtros():
+    """Sin filtros, o con todos vacíos, no hay cláusula ni parámetros"""
+    data_manager = DataManager()
+
+    assert data_manager._build_where_clause(None) == ("", [])
+    assert data_manager._build_where_clause({}) == ("", [])
+    assert data_manager._build_where_clause({'year': None, 'cities': [], 'region': None}) == ("", [])
+
+
+def test_where_clause_year_month_region():
+    """Los filtros de igualdad usan un marcador por valor, en el orden de los filtros"""
+    clause, params = DataManager()._build_where_clause({'year': '2021', 'month': 7, 'region': 'Andalucia'})
+
+    assert clause == "year = ? AND month = ? AND region = ?"
+    assert params == ['2021', 7, 'Andalucia']
+
+
+def test_where_clause_varias_ciudades():
+    """Una lista de ciudades se convierte en IN con un marcador por ciudad"""
+    clause, params = DataManager()._build_where_clause({'cities': ['Sevilla', 'Girona'], 'month': 1})
+
+    assert clause == "city IN (?, ?) AND month = ?"
+    assert params == ['Sevilla', 'Girona', 1]
+
+
+def test_where_clause_rangos_y_claves_ignoradas():
+    """Los filtros meteorológicos son rangos y las claves sin columna (p. ej. date_range) se ignoran"""
+    filters = {
+        'date_range': ('2021-01-01', '2021-12-31'),
+        'min_temp': 10,
+        'max_temp': 30,
+        'max_precip': 5.5,
+        'source': 'aemet',
+    }
+    clause, params = DataManager()._build_where_clause(filters)
+
+    assert clause == "avg_temp >= ? AND avg_temp <= ? AND total_precip <= ?"
+    assert params == [10, 30, 5.5]
+
+
+def test_where_clause_valores_no_interpolados():
+    """Los valores van siempre como parámetros, nunca dentro del texto SQL"""
+    clause, params = DataManager()._build_where_clause({'cities': ["O'Barco"], 'region': "x' OR '1'='1"})
+
+    assert "'" not in clause
+    assert params == ["O'Barco", "x' OR '1'='1"]
+
+
+def test_paginated_data_con_lista_de_ciudades(data_manager):
+    """La cláusula parametrizada se ejecuta en DuckDB y filtra las filas esperadas"""
+    data, metadata = data_manager.get_paginated_data(
+        'summary', filters={'cities': ['Sevilla', 'Girona'], 'year': '2022'}, sort_by='city'
+    )
+
+    assert metadata['total_items'] == 2
+    assert data['city'].tolist() == ['Girona', 'Sevilla']
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Pruebas del filtrado de DataFrames del dashboard (máscara única frente a filtros encadenados)
+"""
+
+import sys
+import os
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.dashboard.filter_manager import filter_dataframe
+
+
+def chained_filter_dataframe(df, filters):
+    """Filtrado anterior: copia del DataFrame y una selección por cada filtro activo"""
+    if df.empty:
+        return df
+
+    if not filters or all(v is None or (isinstance(v, (list, tuple)) and not v) for v in filters.values()):
+        return df
+
+    filtered_df = df.copy()
+
+    if filters.get('year'):
+        filtered_df = filtered_df[filtered_df['year'].astype(str) == str(filters['year'])]
+
+    if filters.get('month'):
+        filtered_df = filtered_df[filtered_df['month'] == int(filters['month'])]
+
+    if filters.get('region') and 'region' in filtered_df.columns:
+        filtered_df = filtered_df[filtered_df['region'] == filters['region']]
+
+    if filters.get('cities') and 'city' in filtered_df.columns:
+        filtered_df = filtered_df[filtered_df['city'].isin(filters['cities'])]
+
+    if filters.get('min_temp') and 'temp_max_c' in filtered_df.columns:
+        filtered_df = filtered_df[filtered_df['temp_max_c'] >= filters['min_temp']]
+
+    if filters.get('max_temp') and 'temp_max_c' in filtered_df.columns:
+        filtered_df = filtered_df[filtered_df['temp_max_c'] <= filters['max_temp']]
+
+    if filters.get('max_precip') and 'precip_mm' in filtered_df.columns:
+        filtered_df = filtered_df[filtered_df['precip_mm'] <= filters['max_precip']]
+
+    if filters.get('source') and 'source' in filtered_df.columns:
+        filtered_df = filtered_df[filtered_df['source'] == filters['source']]
+
+    return filtered_df
+
+
+@pytest.fixture(params=['varchar', 'bigint'])
+def weather_df(request):
+    """Datos diarios con ciudad y región categóricas; year como VARCHAR o BIGINT según la tabla gold"""
+    df = pd.DataFrame({
+        'city': ['Sevilla', 'Sevilla', 'Cordoba', 'Cordoba', 'Girona', 'Girona', 'Vic', 'Vic'],
+        'region': ['Andalucia', 'Andalucia', 'Andalucia', 'Andalucia', 'Cataluña', 'Cataluña', 'Cataluña', 'Cataluña'],
+        'year': [2021, 2022, 2021, 2022, 2021, 2022, 2021, 2022],
+        'month': [1, 7, 7, 1, 1, 7, 7, 1],
+        'temp_max_c': [17.5, 41.2, 39.8, 14.1, 12.3, 29.6, 27.4, 8.9],
+        'precip_mm': [3.2, 0.0, 0.0, 12.4, 25.1, 4.3, 0.0, 18.7],
+        'source': ['aemet', 'meteostat', 'aemet', 'aemet', 'meteostat', 'aemet', 'meteostat', 'aemet'],
+    }, index=[10, 11, 12, 13, 14, 15, 16, 17])
+    df = df.astype({'city': 'category', 'region': 'category'})
+    if request.param == 'varchar':
+        df['year'] = df['year'].astype(str)
+    return df
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'year': None, 'month': None, 'region': None, 'cities': []},
+    {'cities': ()},
+])
+def test_sin_filtros_activos_devuelve_el_mismo_dataframe(weather_df, filters):
+    """Sin filtros activos no se copia ni se selecciona nada"""
+    assert filter_dataframe(weather_df, filters) is weather_df
+
+
+@pytest.mark.parametrize('filters', [
+    {'year': '2021'},
+    {'year': 2022},
+    {'month': '7'},
+    {'region': 'Cataluña'},
+    {'cities': ['Sevilla', 'Vic']},
+    {'cities': ('Cordoba',)},
+    {'min_temp': 20},
+    {'max_temp': 15},
+    {'max_precip': 5},
+    {'source': 'aemet'},
+])
+def test_cada_filtro_igual_que_filtros_encadenados(weather_df, filters):
+    """Cada filtro por separado selecciona las mismas filas que el filtrado encadenado"""
+    result = filter_dataframe(weather_df, filters)
+    expected = chained_filter_dataframe(weather_df, filters)
+
+    assert not expected.empty
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('filters', [
+    {'year': '2021', 'region': 'Andalucia'},
+    {'month': 1, 'cities': ['Sevilla', 'Girona', 'Vic']},
+    {'region': 'Cataluña', 'min_temp': 10, 'max_temp': 30},
+    {'year': 2022, 'max_precip': 15, 'source': 'aemet'},
+    {'year': '2021', 'month': 7, 'region': 'Andalucia', 'cities': ['Cordoba'], 'min_temp': 30,
+     'max_temp': 40, 'max_precip': 1, 'source': 'aemet'},
+    {'year': '2021', 'region': 'Andalucia', 'cities': ['Girona']},
+    {'year': None, 'cities': [], 'region': 'Andalucia'},
+])
+def test_combinaciones_igual_que_filtros_encadenados(weather_df, filters):
+    """Las combinaciones de filtros, incluidas las que no dejan filas, coinciden con el filtrado encadenado"""
+    result = filter_dataframe(weather_df, filters)
+    expected = chained_filter_dataframe(weather_df, filters)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_columnas_ausentes_se_ignoran(weather_df):
+    """Los filtros sobre columnas que no existen en la tabla no descartan filas"""
+    df = weather_df.drop(columns=['region', 'temp_max_c', 'source'])
+    filters = {'region': 'Andalucia', 'min_temp': 30, 'source': 'aemet', 'month': 1}
+
+    result = filter_dataframe(df, filters)
+
+    pd.testing.assert_frame_equal(result, chained_filter_dataframe(df, filters))
+    assert len(result) == 4
+
+
+def test_dataframe_vacio():
+    """Un DataFrame vacío se devuelve tal cual"""
+    df = pd.DataFrame(columns=['city', 'year'])
+    assert filter_dataframe(df, {'year': '2021'}) is df